@@ -0,0 +1,135 @@
+import math
+import random
+
+# Paddle policies for games nobody is playing. A policy returns the mouse x to feed into
+# GameManager.step for the current tick.
+
+class TrackingAutopilot:
+    # Follows the ball with a slowly wandering aim offset, so the demo doesn't look robotic
+    def __init__(self, seed=None, max_offset=35):
+        self.random = random.Random(seed)
+        self.max_offset = max_offset
+        self.offset = 0.0
+
+    def paddle_x(self, game):
+        self.offset += self.random.uniform(-2, 2)
+        self.offset = max(-self.max_offset, min(self.max_offset, self.offset))
+        target = game.ball.position.x + self.offset
+        return int(max(0, min(game.screen_width, target)))
+
+def fold_into(value, low, high):
+    # Position after bouncing between two walls, as if the walls were mirrors
+    span = high - low
+    if span <= 0:
+        return low
+    value = (value - low) % (2 * span)
+    return low + (value if value <= span else 2 * span - value)
+
+def predict_landing(x, y, vx, vy, radius, screen_width, landing_y):
+    # Analytic landing x on the paddle line, reflecting off the side walls and, for a rising
+    # ball, the ceiling. Bricks are ignored; the estimate is refreshed every tick anyway.
+    # A falling ball moves in whole ticks before the paddle check, so use the first tick whose
+    # (integer) ball rect overlaps the paddle.
+    if vy > 0:
+        distance = max(1, math.ceil((landing_y + 1 - y) / vy)) * vy
+    else:
+        distance = (y - radius) + (landing_y - radius)
+    vy = abs(vy) or 1e-9
+    return fold_into(x + vx * distance / vy, radius, screen_width - radius)
+
+def aim_angle(landing_x, landing_y, target_x, target_y, radius, screen_width, min_angle, max_angle):
+    # Bounce angle towards the target or one of its mirror images in the side walls, picking
+    # the image that needs the least correction to fit between min_angle and max_angle
+    span = screen_width - 2 * radius
+    dy = max(landing_y - target_y, 1.0)
+    best_angle = 0.0
+    best_error = None
+    for image in (target_x, 2 * radius - target_x):
+        for shift in (-2 * span, 0, 2 * span):
+            angle = math.atan2(image + shift - landing_x, dy)
+            clamped = max(min_angle, min(max_angle, abs(angle)))
+            error = abs(clamped - abs(angle))
+            if best_error is None or error < best_error:
+                best_angle = clamped if angle >= 0 else -clamped
+                best_error = error
+    return best_angle
+
+class PredictiveAutopilot:
+    # Waits where the ball will land and tilts the bounce towards the remaining bricks using
+    # the angle rule from adjust_ball_velocity_for_paddle_collision
+    def __init__(self, aim_fraction=0.8, seed=None, jitter=0.0, stuck_descents=2):
+        self.aim_fraction = aim_fraction  # Share of the maximum bounce angle the aim may use
+        self.random = random.Random(seed)
+        self.jitter = math.radians(jitter)  # Random aim error per descent, so soak games differ
+        self.stuck_descents = stuck_descents  # Descents without a brick before trying another target
+        self.aim_error = 0.0
+        self.target = None
+        self.was_falling = False
+        self.last_score = None
+        self.stuck = 0
+
+    def choose_target(self, game, landing_x):
+        # Lowest active brick, nearest the landing point; one scan per descent. When that keeps
+        # missing, pick any active brick at random instead.
+        best = None
+        best_key = None
+        active = []
+        for brick in game.bricks:
+            if brick.active:
+                active.append(brick)
+                centre_x = brick.position.x + brick.width / 2
+                key = (-brick.position.y, abs(centre_x - landing_x))
+                if best_key is None or key < best_key:
+                    best, best_key = brick, key
+        if best is None:
+            return None
+        if self.stuck >= self.stuck_descents:
+            best = self.random.choice(active)
+        return best.position.x + best.width / 2, best.position.y + best.height
+
+    def paddle_x(self, game):
+        ball = game.ball
+        paddle = game.paddle
+        landing_y = paddle.position.y - ball.radius
+        landing_x = predict_landing(ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y,
+                                    ball.radius, game.screen_width, landing_y)
+
+        max_angle = math.radians(game.max_bounce_angle)
+        aim_limit = max_angle * self.aim_fraction
+        # A paddle hit only registers while the ball centre is above the paddle's centre line, so
+        # a fast ball coming down steeper than that window per tick can pass straight through
+        window = paddle.height // 2 + ball.radius - 1
+        min_angle = min(math.acos(min(1.0, window / ball.speed)), aim_limit)
+
+        falling = ball.velocity.y > 0
+        if falling and not self.was_falling:
+            self.stuck = self.stuck + 1 if game.score == self.last_score else 0
+            self.last_score = game.score
+            self.target = self.choose_target(game, landing_x)
+            self.aim_error = self.random.uniform(-self.jitter, self.jitter)
+        self.was_falling = falling
+
+        angle = min_angle
+        if self.target is not None:
+            target_x, target_y = self.target
+            angle = aim_angle(landing_x, landing_y, target_x, target_y, ball.radius, game.screen_width,
+                              min_angle, aim_limit) + self.aim_error
+            if abs(angle) < min_angle:
+                angle = min_angle if angle >= 0 else -min_angle
+
+        # Offsets the paddle can reach here, since Paddle.move keeps it on screen
+        low = (landing_x - (game.screen_width - paddle.width)) / paddle.width - 0.5
+        high = landing_x / paddle.width - 0.5
+        offset = max(low, min(high, angle / (2 * max_angle)))
+        if abs(offset) * 2 * max_angle < min_angle:
+            # Clamped against a wall: bounce the other way instead
+            flipped = min_angle / (2 * max_angle) * (-1 if angle >= 0 else 1)
+            offset = max(low, min(high, flipped))
+
+        # Paddle.move centres the paddle on the mouse, so shift it to hit at the chosen offset
+        mouse_x = landing_x - offset * paddle.width
+        return int(round(max(0, min(game.screen_width, mouse_x))))
+
+def make_agent(seed=None):
+    # Agent factory for tournament.py
+    return PredictiveAutopilot(seed=seed)
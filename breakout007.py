@@ -1,10 +1,19 @@
 import pygame
 import math
 import numpy as np
-import json
 import sys
+import argparse
 import os
+import struct
 from pygame.math import Vector2
+from autopilot import TrackingAutopilot
+from multiball import BallArray
+from paddle_input import PaddleInput
+from persistence import SnapshotFile, StatsFile
+from replay import ReplayPlayer, ReplayRecorder, ReplayWriter, load_replay, new_replay_path
+from rewind import NO_BRICK, RewindBuffer
+from session_store import SessionRecorder, SessionStore
+from trajectory import TrajectoryPredictor
 
 if getattr(sys, 'frozen', False):
     # If the application is run as a bundled executable, the PyInstaller bootloader
@@ -44,6 +53,11 @@ def create_beep_sound(frequency=293.66, duration=100, volume=0.2):
     sound = pygame.sndarray.make_sound(stereo_wave)
     return sound
 
+class SilentSound:
+    # Stand-in for pygame sounds when running without a display or mixer
+    def play(self):
+        pass
+
 class GameState:
     START_SCREEN = 1
     LEVEL_LOAD = 2
@@ -52,11 +66,26 @@ class GameState:
     GAME_WON = 5
     LEVEL_COMPLETE = 6
 
+# Fixed binary layout of a game snapshot: magic, version, state, level, brick count, score,
+# ticks, ball x/y/vx/vy/speed, paddle x and one bit per brick (levels have at most 256 bricks).
+# Version 2 follows it with the multiball settings, bricks broken in the level, the extra ball
+# count and the extra balls themselves; see BallArray.pack.
+SNAPSHOT_MAGIC = b'BRK'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_STRUCT = struct.Struct('<3sBBBHIQ6d32s')
+SNAPSHOT_MULTIBALL = struct.Struct('<HHHBIH')  # multiball balls, interval, ball storm, collisions, bricks broken, balls
+MULTIBALL_SETTINGS = ("multiball_balls", "multiball_interval", "ball_storm", "ball_collisions")
+RECOVERY_INTERVAL_TICKS = 180  # Write a crash recovery snapshot every 3 seconds of play
+DEMO_FPS = 20  # The start screen demo runs at a low frame rate to keep idle CPU down
+DEMO_REPLAY = 'demo.bkr'  # Optional bundled replay in the assets folder
+STATIC_WAIT_MS = 1000  # Longest a static screen sleeps in pygame.event.wait
+
 class Paddle:
     def __init__(self, screen_width, screen_height, width=100, height=15):
         self.width = width
         self.height = height
         self.position = Vector2(screen_width // 2 - width // 2, screen_height - height)
+        self.rect = pygame.Rect(self.position.x, self.position.y, width, height)  # Synced before collision tests
         self.color = (255, 255, 255)
 
     def move(self, mouse_x, screen_width):
@@ -90,10 +119,64 @@ class Brick:
         self.height = height
         self.color = color
         self.active = True
+        self.rect = pygame.Rect(position.x, position.y, width, height)  # Bricks never move
 
     def draw(self, screen):
         if self.active:
-            pygame.draw.rect(screen, self.color, (*self.position, self.width, self.height))
+            pygame.draw.rect(screen, self.color, self.rect)
+
+class SimulationState:
+    # In-memory copy of the simulation for search: primitives plus one byte per brick. The brick
+    # objects themselves are shared with the game, and reusing a state object allocates nothing.
+    def __init__(self):
+        self.bricks = None
+        self.mask = bytearray()
+        self.brick_version = None
+        self.ball_data = None  # Extra balls, see multiball.py
+        self.ball_count = 0
+
+class AttractDemo:
+    # A non-interactive game played behind the logo on the start screen, from the bundled
+    # replay when there is one and by the autopilot otherwise
+    def __init__(self, game, replay_path=None):
+        self.game = game
+        self.player = None
+        self.autopilot = TrackingAutopilot()
+        if replay_path and os.path.exists(replay_path):
+            try:
+                self.player = ReplayPlayer(load_replay(replay_path), game)
+            except (OSError, ValueError):
+                self.player = None
+        self.restart()
+
+    def restart(self):
+        if self.player is not None:
+            self.player.seek(0)
+        else:
+            self.game.current_state = GameState.START_SCREEN
+            self.game.handle_click()
+
+    def advance(self, ticks):
+        game = self.game
+        if self.player is not None:
+            self.player.advance(ticks)
+            if self.player.finished():
+                self.restart()
+            return
+        for _ in range(ticks):
+            if game.current_state == GameState.LEVEL_LOAD:
+                game.handle_click()
+            elif game.current_state in [GameState.GAME_OVER, GameState.GAME_WON]:
+                self.restart()
+            game.step(self.autopilot.paddle_x(game))
+
+    def draw(self, screen):
+        game = self.game
+        for brick in game.bricks:
+            brick.draw(screen)
+        game.paddle.draw(screen)
+        if game.current_state in [GameState.GAME_RUNNING, GameState.LEVEL_LOAD]:
+            game.ball.draw(screen)
 
 class GameManager:
     color_points_map = {
@@ -103,93 +186,304 @@ class GameManager:
         (255, 165, 0): 2, # Orange bricks
         (255, 255, 0): 1  # Yellow bricks
     }
-
-    def __init__(self):
-        pygame.init()
+    max_bounce_angle = 60  # Maximum paddle bounce angle in degrees
+    base_ball_speed = 5  # Ball speed on level 1, in pixels per tick
+    level_speed_increase = 8  # Percent added to the ball speed for each level beyond the first
+    paddle_width = 100
+    multiball_balls = 0  # Extra balls a multiball power-up releases; 0 turns power-ups off
+    multiball_interval = 15  # Every this many bricks broken in a level holds a power-up
+    ball_storm = 0  # Extra balls served along with the main ball at the start of every level
+    max_balls = 256
+    ball_collisions = True  # Balls bounce off each other when there is more than one
+    attract_mode = True  # Play a demo on the start screen; off leaves it static for kiosks
+    background_fps = 0  # Frame cap while unfocused; 0 pauses the game until focus returns
+
+    def __init__(self, headless=False, session_store=None, relative_mouse=False, measure_latency=False):
+        # Headless games have no window, sound or high score file and are driven by tools
+        self.headless = headless
+        if not headless:
+            pygame.init()
         self.level = 1  # Initialize the level attribute first
+        self.ticks = 0  # Simulation ticks played since start
+        self.session = None
+        self.replay_recorder = None
+        self.analytics = None  # Optional event log filled in by replay_analytics
+        self.rewind = None if headless else RewindBuffer()
+        self.rewound = False  # Set while the player is holding the rewind key
+        self.tick_brick_hit = NO_BRICK
+        self.tick_paddle_hit = False  # Both for the rewind record of the current tick
+        self.brick_version = 0  # Bumped whenever a brick changes, so cached predictions expire
+        # Collision geometry reused every tick: the ball's square and the active bricks' rects in
+        # list order, rebuilt only when brick_version moves on
+        self.ball_rect = pygame.Rect(0, 0, 0, 0)
+        self.active_bricks = []
+        self.active_brick_rects = []
+        self.active_version = None
+        self.trajectory = None
+        self.balls = BallArray(self.max_balls - 1)  # Every ball but self.ball
+        self.bricks_broken = 0  # In the current level, for multiball power-ups
         self.init_game_properties()
-        self.last_mouse_x = self.screen_width // 2  # Initialize with the screen center
-        self.high_score = self.load_high_score()
-        self.bounce_sound = create_beep_sound()  # Default beep sound for bricks
-        self.wall_paddle_bounce_sound = create_beep_sound(293.66)  # D note for walls and paddle
+        self.paddle_input = None if headless else PaddleInput(self.screen_width, relative_mouse,
+                                                              measure=measure_latency)
+        if headless:
+            self.stats = None
+            self.resume_file = None
+            self.session_high_score = 0
+            self.bounce_sound = SilentSound()
+            self.wall_paddle_bounce_sound = SilentSound()
+        else:
+            # Stats load and save on a background thread; see persistence.py
+            self.stats = StatsFile(legacy_paths=[os.path.join(os.getcwd(), 'stats.json')])
+            self.resume_file = SnapshotFile()
+            self.session_high_score = 0
+            if session_store is None:
+                session_store = SessionStore()
+            self.bounce_sound = create_beep_sound()  # Default beep sound for bricks
+            self.wall_paddle_bounce_sound = create_beep_sound(293.66)  # D note for walls and paddle
+        self.session_store = session_store
+        self.logo_image = None
+        self.demo = None
+        self.needs_redraw = True  # Static screens only draw when this is set
+        self.window_focused = True
+        self.window_minimized = False
         self.current_state = GameState.START_SCREEN
         self.reset_game()
         self.show_start_screen()
 
     def init_game_properties(self):
-        os.environ['SDL_VIDEO_CENTERED'] = '1'  # Center the game window
         self.screen_width, self.screen_height = 800, 600
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("Breakout Game")
-        self.font = pygame.font.SysFont(None, 24)
-        self.paddle = Paddle(self.screen_width, self.screen_height)
-        self.ball = Ball(self.screen_width, self.screen_height)
+        if self.headless:
+            self.screen = None
+            self.font = None
+        else:
+            os.environ['SDL_VIDEO_CENTERED'] = '1'  # Center the game window
+            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+            pygame.display.set_caption("Breakout Game")
+            self.font = pygame.font.SysFont(None, 24)
+        self.paddle = Paddle(self.screen_width, self.screen_height, self.paddle_width)
+        self.ball = Ball(self.screen_width, self.screen_height, speed=self.base_ball_speed)
         self.load_level(self.level)  # Now safe to call load_level
         self.score = 0
         self.running = True
 
+    @property
+    def high_score(self):
+        return max(self.session_high_score, self.load_high_score())
+
     def load_high_score(self):
-        try:
-            with open('stats.json', 'r') as file:
-                data = json.load(file)
-                return data.get('high_score', 0)
-        except (FileNotFoundError, json.JSONDecodeError):
+        # In-memory read; the file itself is loaded by the stats writer thread, so wait for that
+        # once rather than show, and later save over, a high score of 0
+        if self.stats is None:
             return 0
+        self.stats.loaded.wait()
+        return self.stats.get('high_score', 0)
 
     def save_high_score(self):
-        with open('stats.json', 'w') as file:
-            json.dump({'high_score': self.high_score}, file)
+        if self.stats is not None:
+            self.stats.update(high_score=self.session_high_score)
 
     def update_high_score(self):
         if self.score > self.high_score:
-            self.high_score = self.score
+            self.session_high_score = self.score
             self.save_high_score()
 
     def change_state(self, new_state):
         self.current_state = new_state
+        self.needs_redraw = True
         if new_state == GameState.LEVEL_LOAD:
             self.load_level(self.level)
         elif new_state == GameState.GAME_RUNNING:
             self.reset_game()
+            self.start_level_stats()
         elif new_state == GameState.START_SCREEN:
             self.show_start_screen()
         elif new_state in [GameState.GAME_OVER, GameState.GAME_WON]:
+            self.update_high_score()
+            self.stop_replay_recording()
+            if self.resume_file is not None:
+                self.resume_file.clear()
+            if new_state == GameState.GAME_OVER:
+                self.end_session("game_over", cause_of_death="ball_lost", death_x=self.ball.position.x)
+                if self.analytics is not None:
+                    self.analytics.ball_lost(self.level, self.ball.position.x)
+            else:
+                self.end_session("game_won")
             self.level = 1
             self.show_end_screen(new_state)
         elif new_state == GameState.LEVEL_COMPLETE:
+            if self.session is not None:
+                self.session.end_level(True, self.ticks, self.score)
             self.level += 1
             self.change_state(GameState.LEVEL_LOAD)
 
+    def start_level_stats(self):
+        if self.session_store is None:
+            return
+        if self.session is None:
+            self.session = SessionRecorder(self.headless)
+            self.session_start_score = self.score
+        self.session.start_level(self.level, self.ball.speed, self.ticks, self.score)
+
+    def end_session(self, outcome, cause_of_death=None, death_x=None):
+        if self.session is None:
+            return
+        cleared = outcome == "game_won"
+        self.session.end_level(cleared, self.ticks, self.score)
+        record = self.session.finish(outcome, self.score - self.session_start_score, self.ticks,
+                                     cause_of_death, death_x)
+        self.session = None
+        self.session_store.record(record)
+
+    def save_snapshot(self):
+        mask = 0
+        for index, brick in enumerate(self.bricks):
+            if brick.active:
+                mask |= 1 << index
+        ball = self.ball
+        return (SNAPSHOT_STRUCT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.current_state, self.level,
+                                     len(self.bricks), self.score, self.ticks,
+                                     ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y, ball.speed,
+                                     self.paddle.position.x, mask.to_bytes(32, 'little')) +
+                SNAPSHOT_MULTIBALL.pack(self.multiball_balls, self.multiball_interval, self.ball_storm,
+                                        self.ball_collisions, self.bricks_broken, self.balls.count) +
+                self.balls.pack())
+
+    def restore_snapshot(self, data):
+        (magic, version, state, level, brick_count, score, ticks,
+         x, y, vx, vy, speed, paddle_x, mask_bytes) = SNAPSHOT_STRUCT.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version not in [1, SNAPSHOT_VERSION]:
+            raise ValueError("Not a compatible game snapshot")
+        if version == 1:
+            # Older snapshots predate multiball and hold the main ball only
+            if len(data) != SNAPSHOT_STRUCT.size:
+                raise ValueError("Not a compatible game snapshot")
+            settings = (0, self.multiball_interval, 0, self.ball_collisions)
+            bricks_broken = ball_count = 0
+        else:
+            *settings, bricks_broken, ball_count = SNAPSHOT_MULTIBALL.unpack_from(data, SNAPSHOT_STRUCT.size)
+            if (ball_count > self.balls.capacity or
+                    len(data) != SNAPSHOT_STRUCT.size + SNAPSHOT_MULTIBALL.size + 32 * ball_count):
+                raise ValueError("Not a compatible game snapshot")
+
+        if self.rewind is not None:
+            self.rewind.clear()
+
+        # Only rebuild the bricks when the snapshot is from another level
+        if level != self.level or len(self.bricks) != brick_count:
+            self.bricks = self.create_level_bricks(level)
+            # End screens keep the last level's bricks after the level counter resets
+            if len(self.bricks) != brick_count and state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
+                raise ValueError("Snapshot does not match the level layout")
+        mask = int.from_bytes(mask_bytes, 'little')
+        for index, brick in enumerate(self.bricks):
+            brick.active = bool(mask >> index & 1)
+        self.brick_version += 1
+        # The settings travel with the snapshot, so replays and resumed games play by the rules
+        # they were recorded with whatever this process was started with
+        self.multiball_balls, self.multiball_interval, self.ball_storm, collisions = settings
+        self.ball_collisions = bool(collisions)
+        self.bricks_broken = bricks_broken
+        self.balls.unpack(data[SNAPSHOT_STRUCT.size + SNAPSHOT_MULTIBALL.size:], ball_count)
+
+        self.current_state = state
+        self.level = level
+        self.score = score
+        self.ticks = ticks
+        self.ball.position.update(x, y)
+        self.ball.velocity.update(vx, vy)
+        self.ball.speed = speed
+        self.paddle.position.x = paddle_x
+
+    def clone(self, into=None):
+        state = into if into is not None else SimulationState()
+        state.current_state = self.current_state
+        state.level = self.level
+        state.score = self.score
+        state.ticks = self.ticks
+        ball = self.ball
+        state.x, state.y = ball.position.x, ball.position.y
+        state.vx, state.vy = ball.velocity.x, ball.velocity.y
+        state.speed = ball.speed
+        state.paddle_x = self.paddle.position.x
+        state.bricks_broken = self.bricks_broken
+        self.balls.save(state)
+        # The mask only needs copying when a brick changed since this state was last filled
+        if state.bricks is not self.bricks or state.brick_version != self.brick_version:
+            bricks = self.bricks
+            if len(state.mask) != len(bricks):
+                state.mask = bytearray(len(bricks))
+            mask = state.mask
+            for index, brick in enumerate(bricks):
+                mask[index] = brick.active
+            state.bricks = bricks
+            state.brick_version = self.brick_version
+        return state
+
+    def restore(self, state):
+        self.current_state = state.current_state
+        self.level = state.level
+        self.score = state.score
+        self.ticks = state.ticks
+        self.ball.position.update(state.x, state.y)
+        self.ball.velocity.update(state.vx, state.vy)
+        self.ball.speed = state.speed
+        self.paddle.position.x = state.paddle_x
+        self.bricks_broken = state.bricks_broken
+        self.balls.load(state)
+        if state.bricks is not self.bricks or state.brick_version != self.brick_version:
+            self.bricks = state.bricks
+            for index, active in enumerate(state.mask):
+                self.bricks[index].active = bool(active)
+            # A fresh version, never an old one: caches keyed on it may hold another branch's bricks
+            self.brick_version += 1
+            state.brick_version = self.brick_version
+
     def load_level(self, level_number):
         self.level = level_number
         
-        # Increase ball speed by 8% for each level beyond the first
+        # Increase ball speed by level_speed_increase percent for each level beyond the first
         if level_number == 1:
-            self.ball.speed = 5  # Reset to base speed
+            self.ball.speed = self.base_ball_speed  # Reset to base speed
         else:
-            self.ball.increase_speed(8) 
+            self.ball.increase_speed(self.level_speed_increase)
 
         # Load bricks based on the level
+        self.bricks = self.create_level_bricks(level_number)
+        self.brick_version += 1
+        self.balls.clear()
+        self.bricks_broken = 0
+        if self.rewind is not None:
+            self.rewind.clear()  # Rewinding stops at the start of the level
+        if self.analytics is not None:
+            self.analytics.level_loaded(level_number, len(self.bricks))
+
+    def create_level_bricks(self, level_number):
+        bricks = []
         if level_number == 1:
-            self.bricks = self.create_level_1_bricks()
+            bricks = self.create_level_1_bricks()
         elif level_number == 2:
-            self.bricks = self.create_level_2_bricks()
+            bricks = self.create_level_2_bricks()
         elif level_number == 3:
-            self.bricks = self.create_level_3_bricks()
+            bricks = self.create_level_3_bricks()
         elif level_number == 4:
-            self.bricks = self.create_level_4_bricks()
+            bricks = self.create_level_4_bricks()
         elif level_number == 5:
-            self.bricks = self.create_level_5_bricks()
+            bricks = self.create_level_5_bricks()
         elif level_number == 6:
-            self.bricks = self.create_level_6_bricks()
+            bricks = self.create_level_6_bricks()
         elif level_number == 7:
-            self.bricks = self.create_level_7_bricks()
+            bricks = self.create_level_7_bricks()
         elif level_number == 8:
-            self.bricks = self.create_level_8_bricks()
+            bricks = self.create_level_8_bricks()
         elif level_number == 9:
-            self.bricks = self.create_level_9_bricks()
+            bricks = self.create_level_9_bricks()
         elif level_number == 10:
-            self.bricks = self.create_level_10_bricks()
+            bricks = self.create_level_10_bricks()
+
+        # Bricks know their place in the list so per-tick records can refer to them by index
+        for index, brick in enumerate(bricks):
+            brick.index = index
+        return bricks
 
     def create_level_1_bricks(self):
         bricks = []
@@ -402,15 +696,116 @@ class GameManager:
 
     def run(self):
         while self.running:
+            if self.current_state in [GameState.GAME_OVER, GameState.GAME_WON] or self.paused_in_background():
+                self.wait_on_static_screen()
+                continue
             self.handle_events()
-            if self.current_state in [GameState.GAME_RUNNING, GameState.LEVEL_LOAD]:
-                self.update_game_state()
-                if self.current_state == GameState.GAME_RUNNING:
-                    self.check_win_condition()
+            if self.rewind_held():
+                # At the oldest record the frame holds until the key is released
+                if self.rewind.rewind(self):
+                    self.rewound = True
+            elif self.current_state in [GameState.GAME_RUNNING, GameState.LEVEL_LOAD]:
+                self.end_rewind()
+                self.step()
             self.draw_game_screen()
-            pygame.time.Clock().tick(60)
+            self.paddle_input.frame_presented()
+            pygame.time.Clock().tick(60 if self.window_focused else self.background_fps)
+        self.close_stats()
+        if self.paddle_input.measure:
+            print(self.paddle_input.latency_report())
+
+    def paused_in_background(self):
+        # Minimized windows always pause; unfocused ones keep going only with a background FPS cap
+        return self.window_minimized or (not self.window_focused and self.background_fps <= 0)
+
+    def wait_on_static_screen(self):
+        # Nothing moves on the end screens or while paused in the background, so draw once
+        # and sleep until an event arrives
+        if self.needs_redraw and not self.window_minimized:
+            self.needs_redraw = False
+            self.draw_game_screen()
+        event = pygame.event.wait(STATIC_WAIT_MS)
+        if event.type != pygame.NOEVENT:
+            self.handle_event(event)
+            self.handle_events()
+
+    def rewind_held(self):
+        # Holding Backspace plays the running level backwards one tick per frame
+        return (self.rewind is not None and self.current_state == GameState.GAME_RUNNING
+                and pygame.key.get_pressed()[pygame.K_BACKSPACE])
+
+    def end_rewind(self):
+        # Replays cannot re-simulate a rewind, so they get the state it ended on
+        if self.rewound:
+            self.rewound = False
+            if self.replay_recorder is not None:
+                self.replay_recorder.record_restore(self.save_snapshot())
+
+    def step(self, mouse_x=None):
+        # One simulation tick; replays and headless tools pass the paddle input in directly
+        self.update_game_state(mouse_x)
+        if self.current_state == GameState.GAME_RUNNING:
+            self.check_win_condition()
+        if self.replay_recorder is not None and self.replay_recorder.keyframe_due():
+            self.replay_recorder.record_keyframe(self.save_snapshot())
+
+    def start_or_resume(self):
+        # Clicking start picks up a game left unfinished by a quit or a crash
+        resume_data = None
+        if self.resume_file is not None:
+            self.resume_file.loaded.wait()  # A click during startup must not miss the saved game
+            resume_data = self.resume_file.data
+        if resume_data is None:
+            # A new game plays with this process's settings, not ones an earlier resume restored
+            for name in MULTIBALL_SETTINGS:
+                self.__dict__.pop(name, None)
+            self.change_state(GameState.LEVEL_LOAD)
+        else:
+            try:
+                self.restore_snapshot(resume_data)
+                if self.current_state == GameState.GAME_RUNNING:
+                    self.start_level_stats()
+            except (ValueError, struct.error):
+                self.resume_file.clear()
+                self.change_state(GameState.LEVEL_LOAD)
+        if not self.headless:
+            self.start_replay_recording()
+
+    def start_replay_recording(self, path=None, writer=None):
+        # Replays go to their own file unless a writer such as a replay archive sink is given
+        self.stop_replay_recording()
+        if writer is None:
+            writer = ReplayWriter(path or new_replay_path())
+        self.replay_recorder = ReplayRecorder(self.save_snapshot(), writer)
+
+    def stop_replay_recording(self):
+        if self.replay_recorder is not None:
+            self.replay_recorder.finish(self.score, self.ticks, self.level)
+            self.replay_recorder = None
+
+    def save_recovery_snapshot(self):
+        if self.resume_file is not None:
+            self.resume_file.save(self.save_snapshot())
+
+    def close_stats(self):
+        # Let the writer threads finish any pending save before the process exits
+        if self.current_state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
+            self.save_recovery_snapshot()
+            self.end_session("quit")
+        if self.replay_recorder is not None:
+            writer = self.replay_recorder.writer
+            self.stop_replay_recording()
+            writer.join()
+        if self.resume_file is not None:
+            self.resume_file.close()
+        if self.session_store is not None:
+            self.session_store.close()
+        if self.stats is not None:
+            self.stats.close()
             
     def play_brick_sound(self, color):
+        if self.headless:
+            return
         # Define the frequencies for each color
         color_frequency_map = {
             (255, 255, 0): 329.63,  # Yellow (E note)
@@ -424,34 +819,86 @@ class GameManager:
         sound.play()
 
     def show_start_screen(self):
+        if self.headless:
+            return
+        if self.attract_mode:
+            if self.demo is None:
+                self.demo = AttractDemo(GameManager(headless=True), os.path.join(asset_path, DEMO_REPLAY))
+            else:
+                self.demo.restart()
         self.draw_start_screen()
         self.wait_for_start()
             
     def wait_for_start(self):
+        # The demo runs at DEMO_FPS; Clock.tick sleeps between frames instead of spinning
+        # Without the demo the screen is static and the loop blocks in pygame.event.wait
+        clock = pygame.time.Clock()
+        ticks_per_frame = 60 // DEMO_FPS
+        self.needs_redraw = False
         while self.current_state == GameState.START_SCREEN:
-            for event in pygame.event.get():
+            if self.demo is None or self.paused_in_background():
+                events = [pygame.event.wait(STATIC_WAIT_MS)] + pygame.event.get()
+            else:
+                events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
+                    self.close_stats()
                     pygame.quit()
                     exit()
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    self.change_state(GameState.LEVEL_LOAD)
+                    self.start_or_resume()
+                    return
+                self.handle_window_event(event)
+            if self.demo is not None and not self.paused_in_background():
+                self.demo.advance(ticks_per_frame)
+                self.draw_start_screen()
+                clock.tick(DEMO_FPS if self.window_focused else min(DEMO_FPS, self.background_fps))
+            elif self.needs_redraw and not self.window_minimized:
+                self.needs_redraw = False
+                self.draw_start_screen()
+
+    # Events after which a static screen has to be drawn again
+    redraw_events = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED,
+                     pygame.WINDOWSHOWN, pygame.WINDOWSIZECHANGED, pygame.WINDOWFOCUSGAINED)
 
     def handle_events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.MOUSEMOTION:
-                if self.current_state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
-                    self.last_mouse_x = event.pos[0]
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if self.current_state == GameState.START_SCREEN:
-                    self.change_state(GameState.LEVEL_LOAD)
-                elif self.current_state in [GameState.GAME_OVER, GameState.GAME_WON]:
-                    self.change_state(GameState.START_SCREEN)
-                elif self.current_state == GameState.LEVEL_COMPLETE:
-                    self.change_state(GameState.LEVEL_LOAD)
-                elif self.current_state == GameState.LEVEL_LOAD:
-                    self.change_state(GameState.GAME_RUNNING)
+            self.handle_event(event)
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.MOUSEMOTION:
+            if self.current_state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
+                self.paddle_input.motion(event)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.handle_click()
+        else:
+            self.handle_window_event(event)
+
+    def handle_window_event(self, event):
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.window_focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.window_focused = True
+        elif event.type in [pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN]:
+            self.window_minimized = True
+        elif event.type in [pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWMAXIMIZED]:
+            self.window_minimized = False
+        if event.type in self.redraw_events:
+            self.needs_redraw = True
+
+    def handle_click(self):
+        if self.replay_recorder is not None:
+            self.replay_recorder.record_click()
+        if self.current_state == GameState.START_SCREEN:
+            self.start_or_resume()
+        elif self.current_state in [GameState.GAME_OVER, GameState.GAME_WON]:
+            self.change_state(GameState.START_SCREEN)
+        elif self.current_state == GameState.LEVEL_COMPLETE:
+            self.change_state(GameState.LEVEL_LOAD)
+        elif self.current_state == GameState.LEVEL_LOAD:
+            self.change_state(GameState.GAME_RUNNING)
 
     def draw_game_screen(self):
         self.screen.fill((0, 0, 0))  # Clear screen
@@ -459,6 +906,9 @@ class GameManager:
 
         if self.current_state in [GameState.GAME_RUNNING, GameState.LEVEL_LOAD]:
             self.ball.draw(self.screen)
+            for index in range(self.balls.count):
+                pygame.draw.circle(self.screen, self.ball.color, (int(self.balls.x[index]), int(self.balls.y[index])),
+                                   self.balls.radius)
         
         for brick in self.bricks:
             brick.draw(self.screen)
@@ -494,28 +944,52 @@ class GameManager:
             self.normalize_ball_velocity()
 
         # Ball and paddle
+        self.update_ball_rect()
         paddle_collision_side = self.paddle_collision()
         if paddle_collision_side:
             self.handle_paddle_collision(paddle_collision_side)
             self.wall_paddle_bounce_sound.play()
 
-        # Ball and bricks
-        for brick in self.bricks:
-            if brick.active and self.brick_collision(brick):
-                self.handle_brick_collision(brick)
-                break  # Break after handling the first collision
+        # Ball and bricks: only the first active brick in list order is handled
+        if self.active_version != self.brick_version:
+            self.update_active_bricks()
+        index = self.ball_rect.collidelist(self.active_brick_rects)
+        if index != -1:
+            self.handle_brick_collision(self.active_bricks[index])
+
+    def update_ball_rect(self):
+        # int() truncates like the Rect constructor; assigning a float to a Rect attribute rounds
+        ball = self.ball
+        rect = self.ball_rect
+        rect.x = int(ball.position.x - ball.radius)
+        rect.y = int(ball.position.y - ball.radius)
+        rect.width = rect.height = 2 * ball.radius
+        return rect
+
+    def update_active_bricks(self):
+        self.active_bricks = [brick for brick in self.bricks if brick.active]
+        self.active_brick_rects = [brick.rect for brick in self.active_bricks]
+        self.active_version = self.brick_version
+
+    def predict_collisions(self, count=8):
+        # Next wall, brick and paddle-line events for the ball as it moves now; see trajectory.py
+        if self.trajectory is None:
+            self.trajectory = TrajectoryPredictor(self.screen_width, self.paddle.position.y)
+        ball = self.ball
+        return self.trajectory.predict(ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y,
+                                       ball.radius, self.bricks, self.brick_version, count, ball.speed)
 
     def normalize_ball_velocity(self):
         speed = self.ball.speed
         self.ball.velocity = self.ball.velocity.normalize() * speed
 
     def paddle_collision(self):
-        ball_rect = pygame.Rect(self.ball.position.x - self.ball.radius, self.ball.position.y - self.ball.radius, 
-                                2 * self.ball.radius, 2 * self.ball.radius)
-        paddle_rect = pygame.Rect(self.paddle.position.x, self.paddle.position.y, 
-                                  self.paddle.width, self.paddle.height)
+        # Expects update_ball_rect to have run this tick
+        paddle_rect = self.paddle.rect
+        paddle_rect.x = int(self.paddle.position.x)
+        paddle_rect.y = int(self.paddle.position.y)
 
-        if ball_rect.colliderect(paddle_rect):
+        if self.ball_rect.colliderect(paddle_rect):
             return self.calculate_collision_side_with_direction(self.paddle)
         return None
 
@@ -524,14 +998,17 @@ class GameManager:
             # Calculate the offset from the center of the paddle for more dynamic bounce
             offset = (self.ball.position.x - self.paddle.position.x) / self.paddle.width - 0.5
             self.adjust_ball_velocity_for_paddle_collision(offset)
+            self.tick_paddle_hit = True
+            if self.session is not None:
+                self.session.paddle_hit(self.ball.speed)
+            if self.analytics is not None:
+                self.analytics.paddle_hit(self.level, offset)
         elif collision_side in ["left", "right"]:
             # Only reverse the horizontal velocity
             self.ball.velocity.x *= -1
 
     def handle_brick_collision(self, brick):
-        brick.active = False
-        self.score += brick.points
-        self.bounce_sound.play()
+        self.break_brick(brick)
 
         # Calculate the collision side considering the ball's direction
         collision_side = self.calculate_collision_side_with_direction(brick)
@@ -549,11 +1026,34 @@ class GameManager:
         self.normalize_ball_velocity()
         
         self.play_brick_sound(brick.color)
+
+    def break_brick(self, brick):
+        # Removes a brick and scores it, whichever ball hit it
+        brick.active = False
+        self.brick_version += 1
+        if self.active_version == self.brick_version - 1:
+            # Keep the active lists current instead of rebuilding them next tick
+            index = self.active_bricks.index(brick)
+            del self.active_bricks[index]
+            del self.active_brick_rects[index]
+            self.active_version = self.brick_version
+        self.score += brick.points
+        self.tick_brick_hit = brick.index
+        if self.session is not None:
+            self.session.brick_hit(brick.color)
+        if self.analytics is not None:
+            self.analytics.brick_hit(self.level, brick.position)
+        self.bounce_sound.play()
+        self.bricks_broken += 1
+        if self.multiball_balls and self.bricks_broken % self.multiball_interval == 0:
+            # The power-up releases its balls from where the brick stood
+            self.balls.spread(brick.rect.centerx, brick.rect.centery, self.ball.speed, self.multiball_balls,
+                              self.max_bounce_angle)
         
     def calculate_collision_side_with_direction(self, brick):
         ball_center = self.ball.position
         ball_direction = self.ball.velocity
-        brick_rect = pygame.Rect(brick.position.x, brick.position.y, brick.width, brick.height)
+        brick_rect = brick.rect  # Works for the paddle too, once paddle_collision has synced its rect
 
         # Determine the likely side of collision based on the direction of the ball
         if ball_direction.y > 0:  # Moving down
@@ -574,14 +1074,11 @@ class GameManager:
         return "top" if ball_center.y < brick_rect.centery else "bottom"
 
     def brick_collision(self, brick):
-        ball_rect = pygame.Rect(self.ball.position.x - self.ball.radius, self.ball.position.y - self.ball.radius, 
-                                2 * self.ball.radius, 2 * self.ball.radius)
-        brick_rect = pygame.Rect(brick.position.x, brick.position.y, brick.width, brick.height)
-        return ball_rect.colliderect(brick_rect)
+        return self.update_ball_rect().colliderect(brick.rect)
 
     def adjust_ball_velocity_for_paddle_collision(self, offset):
-        # Maximum bounce angle of 60 degrees in radians
-        max_bounce_angle = math.radians(60)
+        # Maximum bounce angle in radians
+        max_bounce_angle = math.radians(self.max_bounce_angle)
 
         # Calculate the new angle of the ball
         angle = max_bounce_angle * offset * 2
@@ -605,25 +1102,49 @@ class GameManager:
         self.position_ball_on_paddle()
         self.ball.velocity = Vector2(self.ball.speed, -self.ball.speed)
         self.load_level(self.level)
+        if self.ball_storm and self.current_state == GameState.GAME_RUNNING:
+            self.balls.spread(self.ball.position.x, self.ball.position.y, self.ball.speed, self.ball_storm,
+                              self.max_bounce_angle)
 
     def position_ball_on_paddle(self):
         paddle_top = self.screen_height - self.paddle.height - self.ball.radius - 1
         self.ball.position = Vector2(self.paddle.position.x + self.paddle.width / 2, paddle_top)
     
-    def update_game_state(self):
+    def update_game_state(self, mouse_x=None):
         if self.current_state in [GameState.GAME_RUNNING, GameState.LEVEL_LOAD]:
-            mouse_x, _ = pygame.mouse.get_pos()
+            if mouse_x is None:
+                # Sampled as late as possible, right before the ball and paddle move
+                mouse_x = self.paddle_input.sample()
+            if self.replay_recorder is not None:
+                self.replay_recorder.record_tick(mouse_x)
             if 0 <= mouse_x <= self.screen_width:
                 self.paddle.move(mouse_x, self.screen_width)
                 if self.current_state == GameState.LEVEL_LOAD:
                     self.position_ball_on_paddle()  # Keep the ball on the paddle
 
             if self.current_state == GameState.GAME_RUNNING:
+                self.ticks += 1
+                if self.ticks % RECOVERY_INTERVAL_TICKS == 0:
+                    self.save_recovery_snapshot()
                 self.ball.move()
+                self.tick_brick_hit = NO_BRICK
+                self.tick_paddle_hit = False
                 self.check_collisions()
+                if self.balls.count:
+                    self.balls.step(self)
+                    if self.ball_collisions:
+                        self.balls.collide(self)
+                if self.rewind is not None:
+                    if self.balls.count:
+                        self.rewind.clear()  # Rewind records hold one ball; history restarts after multiball
+                    else:
+                        self.rewind.record(self, self.tick_brick_hit, self.tick_paddle_hit)
                 self.check_win_condition()
                 if self.ball.position.y - self.ball.radius > self.screen_height:
-                    self.change_state(GameState.GAME_OVER)
+                    if self.balls.count:
+                        self.balls.pop_first(self.ball)  # The oldest extra ball takes over
+                    else:
+                        self.change_state(GameState.GAME_OVER)
 
     def draw_score(self):
         score_text = self.font.render(f"Score: {self.score}", True, (255, 255, 255))
@@ -645,6 +1166,8 @@ class GameManager:
         self.screen.blit(level_surface, (self.screen_width - 100, 10))
 
     def show_end_screen(self, end_state):
+        if self.headless:
+            return
         if end_state == GameState.GAME_OVER:
             self.draw_game_over_screen()
         else:
@@ -654,27 +1177,28 @@ class GameManager:
         self.display_centered_text("GAME OVER", self.screen_height // 2 - 30)
         self.display_centered_text(f"Final Score: {self.score}", self.screen_height // 2)
         self.display_centered_text("Click to Restart", self.screen_height // 2 + 30)
-        self.update_high_score()
 
     def draw_win_screen(self):
         self.display_centered_text("Congratulations, you win!", self.screen_height // 2 - 30)
-        self.display_centered_text(f"Final Score: {self.score}", center_y)
-        self.display_centered_text("Click to Restart", center_y + 30)
-
-        pygame.display.flip()
+        self.display_centered_text(f"Final Score: {self.score}", self.screen_height // 2)
+        self.display_centered_text("Click to Restart", self.screen_height // 2 + 30)
 
     def draw_start_screen(self):
         self.screen.fill((0, 0, 0))  # Clear screen
+        if self.demo is not None:
+            self.demo.draw(self.screen)
 
-        # Load the logo image from the 'assets' folder
-        logo_path = os.path.join(asset_path, 'logo.png')
-        logo_image = pygame.image.load(logo_path)
+        if self.logo_image is None:
+            # Load the logo image from the 'assets' folder
+            logo_path = os.path.join(asset_path, 'logo.png')
+            logo_image = pygame.image.load(logo_path).convert()
 
-        # Resize the logo to fill the entire game screen
-        logo_image = pygame.transform.scale(logo_image, (self.screen_width, self.screen_height))
+            # Resize the logo to fill the entire game screen, translucent so the demo shows through
+            self.logo_image = pygame.transform.scale(logo_image, (self.screen_width, self.screen_height))
+            self.logo_image.set_alpha(170)
 
         # Display the resized logo image
-        self.screen.blit(logo_image, (0, 0))
+        self.screen.blit(self.logo_image, (0, 0))
 
         # Position the "Click to Start" text at the bottom of the screen
         self.display_centered_text("Click to Start", self.screen_height - 30)
@@ -687,5 +1211,19 @@ class GameManager:
 
 # Main execution
 if __name__ == "__main__":
-    game_manager = GameManager()
+    parser = argparse.ArgumentParser(description="Breakout")
+    parser.add_argument("--relative-mouse", action="store_true", help="Grab the mouse and move the paddle by raw motion")
+    parser.add_argument("--measure-latency", action="store_true", help="Report input-to-flip latency on exit")
+    parser.add_argument("--multiball", type=int, default=0, help="Extra balls released by multiball power-ups")
+    parser.add_argument("--ball-storm", type=int, default=0, help="Extra balls served at the start of every level")
+    parser.add_argument("--background-fps", type=int, default=GameManager.background_fps,
+                        help="Frame cap while the window is unfocused; 0 pauses until focus returns")
+    parser.add_argument("--no-attract", action="store_true", help="Keep the start screen static instead of playing a demo")
+    args = parser.parse_args()
+    GameManager.multiball_balls = args.multiball
+    GameManager.ball_storm = args.ball_storm
+    GameManager.background_fps = args.background_fps
+    GameManager.attract_mode = not args.no_attract
+
+    game_manager = GameManager(relative_mouse=args.relative_mouse, measure_latency=args.measure_latency)
     game_manager.run()
\ No newline at end of file
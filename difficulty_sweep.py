@@ -0,0 +1,130 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+
+from persistence import drop_partial_line
+
+# Difficulty sweep: plays the predictive autopilot headless through all 10 levels for every
+# combination of ball speed, per-level speed increase, paddle width and bounce angle, and
+# writes one row per combination as soon as it finishes. Rows already in the output file are
+# skipped, so an interrupted sweep picks up where it stopped.
+
+PARAMETERS = ["base_ball_speed", "level_speed_increase", "paddle_width", "max_bounce_angle"]
+RESULT_FIELDS = ["games", "clear_rate", "mean_clear_ticks", "mean_clear_seconds", "mean_score", "mean_levels"]
+FIELDS = PARAMETERS + RESULT_FIELDS
+TICKS_PER_SECOND = 60
+
+def parse_values(text):
+    return [float(value) if "." in value else int(value) for value in text.split(",")]
+
+def parameter_key(values):
+    # Rows are matched by their formatted parameters so floats read back from the CSV compare equal
+    return tuple(f"{float(value):g}" for value in values)
+
+# One session store per worker process, when the sweep records sessions
+worker_store = None
+
+def play_combination(task):
+    global worker_store
+    from autopilot import PredictiveAutopilot
+    from breakout007 import GameManager, GameState
+    from session_store import SessionStore
+    from soak_test import play_autopilot_game
+
+    values, games, max_ticks, jitter, fast, sessions = task
+    if sessions and worker_store is None:
+        worker_store = SessionStore(sessions)
+    # A subclass carries the parameters, since the paddle and ball are built in __init__
+    game_class = type("SweepGameManager", (GameManager,), dict(zip(PARAMETERS, values)))
+    clear_ticks = []
+    scores = []
+    levels = []
+    for number in range(games):
+        autopilot = PredictiveAutopilot(seed=number, jitter=jitter if number else 0.0)
+        cleared, score, _, game = play_autopilot_game(autopilot, max_ticks, game_class(headless=True, session_store=worker_store), fast)
+        if game.current_state == GameState.GAME_WON:
+            clear_ticks.append(game.ticks)
+        scores.append(score)
+        levels.append(cleared)
+    if worker_store is not None:
+        worker_store.flush()  # Pool workers are terminated, not closed
+
+    mean_clear_ticks = sum(clear_ticks) / len(clear_ticks) if clear_ticks else None
+    row = dict(zip(PARAMETERS, values))
+    row.update({
+        "games": games,
+        "clear_rate": len(clear_ticks) / games,
+        "mean_clear_ticks": mean_clear_ticks,
+        "mean_clear_seconds": mean_clear_ticks / TICKS_PER_SECOND if clear_ticks else None,
+        "mean_score": sum(scores) / games,
+        "mean_levels": sum(levels) / games
+    })
+    return row
+
+def finished_combinations(path):
+    # Parameter keys already in the results file, minus a row cut off by an interrupted write
+    if not os.path.exists(path):
+        return set()
+    drop_partial_line(path)
+    with open(path, newline="") as file:
+        return {parameter_key([row[name] for name in PARAMETERS]) for row in csv.DictReader(file)}
+
+def sweep(grid, output, games=4, max_ticks=300000, jitter=3.0, processes=None, chunksize=2, fast=False,
+          sessions=None):
+    done = finished_combinations(output)
+    tasks = [(values, games, max_ticks, jitter, fast, sessions) for values in itertools.product(*grid)
+             if parameter_key(values) not in done]
+    print(f"{len(done)} combinations already done, {len(tasks)} to run")
+    if not tasks:
+        return
+
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, "a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            # Workers take chunks of combinations; each row is flushed as soon as it arrives
+            for number, row in enumerate(pool.imap_unordered(play_combination, tasks, chunksize=chunksize), 1):
+                writer.writerow(row)
+                file.flush()
+                print(f"[{number}/{len(tasks)}] " + ", ".join(f"{name} {row[name]}" for name in PARAMETERS) +
+                      f": clear rate {row['clear_rate']:.0%} ({time.perf_counter() - start:.0f}s)")
+
+def print_table(output):
+    with open(output, newline="") as file:
+        rows = list(csv.DictReader(file))
+    rows.sort(key=lambda row: [float(row[name]) for name in PARAMETERS])
+    print(f"{'Speed':>6} {'Incr%':>6} {'Paddle':>6} {'Angle':>6} {'Clear':>6} {'Time':>8} {'Score':>7} {'Levels':>6}")
+    for row in rows:
+        clear_time = f"{float(row['mean_clear_seconds']):.0f}s" if row["mean_clear_seconds"] else "-"
+        print(f"{float(row['base_ball_speed']):>6g} {float(row['level_speed_increase']):>6g} "
+              f"{float(row['paddle_width']):>6g} {float(row['max_bounce_angle']):>6g} "
+              f"{float(row['clear_rate']):>6.0%} {clear_time:>8} {float(row['mean_score']):>7.0f} "
+              f"{float(row['mean_levels']):>6.1f}")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep ball and paddle physics and measure how often the autopilot clears the game.")
+    parser.add_argument("--speeds", type=parse_values, default=[4, 5, 6], help="Comma-separated level 1 ball speeds")
+    parser.add_argument("--increases", type=parse_values, default=[6, 8, 10], help="Comma-separated per-level speed increases in percent")
+    parser.add_argument("--paddle-widths", type=parse_values, default=[80, 100, 120])
+    parser.add_argument("--angles", type=parse_values, default=[45, 60, 75], help="Comma-separated max bounce angles in degrees")
+    parser.add_argument("--games", type=int, default=4, help="Autopilot games per combination")
+    parser.add_argument("--max-ticks", type=int, default=300000, help="Give up on a game after this many frames")
+    parser.add_argument("--jitter", type=float, default=3.0, help="Aim error in degrees for games after the first")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=2, help="Combinations handed to a worker at a time")
+    parser.add_argument("--output", default="difficulty_sweep.csv")
+    parser.add_argument("--fast", action="store_true", help="Jump over ticks where the ball only moves")
+    parser.add_argument("--sessions", help="Record every game in this session database")
+    args = parser.parse_args()
+
+    sweep([args.speeds, args.increases, args.paddle_widths, args.angles], args.output, args.games,
+          args.max_ticks, args.jitter, args.processes, args.chunksize, args.fast,
+          args.sessions)
+    print_table(args.output)
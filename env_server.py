@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+from observation import ObservationRenderer
+from vector_env import BreakoutEnv, observation_shape
+
+# Environment server: hosts many headless games and serves reset/step over a local TCP or
+# Unix socket, so agents in other processes or languages can drive them.
+#
+# Protocol, all little-endian. A request is a header (opcode u8, env count K u16) and a body;
+# the reply is a header (status u8, count u16) and a body. Arrays are sent one after another
+# rather than interleaved per env, so both ends can read them with a single frombuffer each.
+#   HELLO  body -               reply: env count u32, observation ndim u8, ndim x u32 dims
+#   RESET  body ids u32[K]      reply: observations u8[K, *shape]
+#   STEP   body ids u32[K],     reply: rewards f32[K], dones u8[K], scores u32[K],
+#               actions f32[K]         observations u8[K, *shape]
+# An error reply has status 1 and count bytes of UTF-8 message. Done envs are reset before
+# their observation is taken, so the observation starts the next episode.
+
+HELLO = 0
+RESET = 1
+STEP = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+REQUEST_HEADER = struct.Struct('<BH')
+RESPONSE_HEADER = struct.Struct('<BH')
+HELLO_RESPONSE = struct.Struct('<IB')
+MAX_BATCH = 65535
+
+class EnvServer:
+    def __init__(self, num_envs, observation="pixels", frame_skip=1, max_ticks=None):
+        self.envs = [BreakoutEnv(frame_skip, max_ticks) for _ in range(num_envs)]
+        for env in self.envs:
+            env.reset()
+        self.renderer = None
+        self.obs_shape = (0,)
+        if observation != "none":
+            self.renderer = ObservationRenderer()
+            self.obs_shape = observation_shape(observation, self.renderer)
+            self.render = self.renderer.render if observation == "pixels" else self.renderer.grid_planes
+
+    def observations(self, envs):
+        if self.renderer is None:
+            return b""
+        return self.render([env.game for env in envs]).tobytes()
+
+    def lookup(self, ids):
+        if len(ids) and int(ids.max()) >= len(self.envs):
+            raise ValueError(f"Env id {int(ids.max())} out of range (0-{len(self.envs) - 1})")
+        return [self.envs[i] for i in ids.tolist()]
+
+    def handle(self, op, count, body):
+        # One request in, one reply body out; ValueError becomes an error reply
+        if op == HELLO:
+            return HELLO_RESPONSE.pack(len(self.envs), len(self.obs_shape)) + struct.pack(
+                f'<{len(self.obs_shape)}I', *self.obs_shape)
+        ids = np.frombuffer(body, dtype='<u4', count=count)
+        envs = self.lookup(ids)
+        if op == RESET:
+            for env in envs:
+                env.reset()
+            return self.observations(envs)
+        if op == STEP:
+            actions = np.frombuffer(body, dtype='<f4', count=count, offset=4 * count)
+            rewards = np.empty(count, dtype='<f4')
+            dones = np.empty(count, dtype=np.uint8)
+            scores = np.empty(count, dtype='<u4')
+            for index, env in enumerate(envs):
+                reward, done = env.step(actions[index])
+                rewards[index] = reward
+                dones[index] = done
+                scores[index] = env.game.score
+                if done:
+                    env.reset()
+            return rewards.tobytes() + dones.tobytes() + scores.tobytes() + self.observations(envs)
+        raise ValueError(f"Unknown opcode {op}")
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                op, count = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+                body_size = {HELLO: 0, RESET: 4 * count, STEP: 8 * count}.get(op, 0)
+                body = await reader.readexactly(body_size) if body_size else b""
+                try:
+                    reply = self.handle(op, count, body)
+                    writer.write(RESPONSE_HEADER.pack(STATUS_OK, count) + reply)
+                except ValueError as error:
+                    message = str(error).encode()[:MAX_BATCH]
+                    writer.write(RESPONSE_HEADER.pack(STATUS_ERROR, len(message)) + message)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client disconnected
+        finally:
+            writer.close()
+
+    async def serve(self, address, ready=None):
+        if is_unix_address(address):
+            path = address[len("unix:"):]
+            if os.path.exists(path):
+                os.remove(path)
+            server = await asyncio.start_unix_server(self.serve_client, path)
+        else:
+            host, port = parse_tcp_address(address)
+            server = await asyncio.start_server(self.serve_client, host, port)
+        if ready is not None:
+            ready()
+        async with server:
+            await server.serve_forever()
+
+def is_unix_address(address):
+    return address.startswith("unix:")
+
+def parse_tcp_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def read_exactly(sock, size):
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        chunk = sock.recv_into(view[received:])
+        if not chunk:
+            raise ConnectionError("Env server closed the connection")
+        received += chunk
+    return data
+
+class EnvClient:
+    # Blocking client for Python agents; other languages can follow the protocol notes above
+    def __init__(self, address):
+        if is_unix_address(address):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address[len("unix:"):])
+        else:
+            self.sock = socket.create_connection(parse_tcp_address(address))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.num_envs, ndim = HELLO_RESPONSE.unpack(self.request(HELLO, 0, b"", HELLO_RESPONSE.size))
+        self.obs_shape = struct.unpack(f'<{ndim}I', read_exactly(self.sock, 4 * ndim))
+        self.obs_size = int(np.prod(self.obs_shape)) if self.obs_shape != (0,) else 0
+
+    def request(self, op, count, body, reply_size):
+        self.sock.sendall(REQUEST_HEADER.pack(op, count) + body)
+        status, reply_count = RESPONSE_HEADER.unpack(read_exactly(self.sock, RESPONSE_HEADER.size))
+        if status != STATUS_OK:
+            raise ValueError(read_exactly(self.sock, reply_count).decode())
+        return read_exactly(self.sock, reply_size) if reply_size else b""
+
+    def env_ids(self, ids):
+        ids = np.arange(self.num_envs) if ids is None else ids
+        return np.ascontiguousarray(ids, dtype='<u4')
+
+    def reset(self, ids=None):
+        ids = self.env_ids(ids)
+        count = len(ids)
+        data = self.request(RESET, count, ids.tobytes(), count * self.obs_size)
+        return np.frombuffer(data, dtype=np.uint8).reshape((count,) + self.obs_shape)
+
+    def step(self, actions, ids=None):
+        # Steps K envs in one round trip; returns (observations, rewards, dones, scores)
+        ids = self.env_ids(ids)
+        count = len(ids)
+        actions = np.ascontiguousarray(actions, dtype='<f4')
+        data = self.request(STEP, count, ids.tobytes() + actions.tobytes(), count * (9 + self.obs_size))
+        rewards = np.frombuffer(data, dtype='<f4', count=count)
+        dones = np.frombuffer(data, dtype=np.uint8, count=count, offset=4 * count).astype(bool)
+        scores = np.frombuffer(data, dtype='<u4', count=count, offset=5 * count)
+        observations = np.frombuffer(data, dtype=np.uint8, offset=9 * count).reshape((count,) + self.obs_shape)
+        return observations, rewards, dones, scores
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def benchmark(address, batch_sizes, seconds):
+    # Env steps per second for different batch sizes against a running server
+    rng = np.random.default_rng(0)
+    with EnvClient(address) as client:
+        client.reset()
+        for batch in batch_sizes:
+            batch = min(batch, client.num_envs)
+            ids = np.arange(batch)
+            steps = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                client.step(rng.uniform(0, 800, batch), ids)
+                steps += batch
+            elapsed = time.perf_counter() - start
+            print(f"batch {batch:>4}: {steps / elapsed:>8.0f} env steps/s, "
+                  f"{elapsed / (steps / batch) * 1000:.2f} ms per round trip")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve headless Breakout envs over a local socket.")
+    parser.add_argument("--address", default="127.0.0.1:7357", help="host:port or unix:/path/to/socket")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--observation", choices=["pixels", "grid", "none"], default="pixels")
+    parser.add_argument("--frame-skip", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="Run a test client against a server at --address")
+    parser.add_argument("--batch", type=int, action="append", help="Batch size to benchmark (repeatable)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.address, args.batch or [1, 8, 64], args.seconds)
+        sys.exit(0)
+    server = EnvServer(args.envs, args.observation, args.frame_skip, args.max_ticks)
+    print(f"Serving {args.envs} envs on {args.address}")
+    try:
+        asyncio.run(server.serve(args.address))
+    except KeyboardInterrupt:
+        pass
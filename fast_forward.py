@@ -0,0 +1,228 @@
+import numpy as np
+
+from breakout007 import GameState
+from replay import CLICK, RESTORE
+from rewind import NO_BRICK
+
+# Event-driven fast-forward for headless games. Most ticks only move the ball along a straight
+# line, so instead of stepping them one by one the ball is carried straight to the next tick on
+# which something can happen, and that tick is stepped with the game's own code.
+#
+# Whether a tick can do anything depends only on where the ball centre ends up: check_collisions
+# tests truncated rects, so a brick is hit exactly when floor(x) and floor(y) fall inside the
+# brick grown by the radius less one pixel on the leading sides, and the walls, paddle and
+# bottom of the screen are bands of whole pixels as well. The cover map counts, for every pixel
+# of the screen, the active bricks and bands that claim it; a covered margin around the screen
+# catches positions past the walls without clipping. Positions are accumulated with
+# np.add.accumulate, the same sequence of float additions that Ball.move makes, so the game
+# after a jump is bit for bit the game after stepping, and the next event tick is the first
+# accumulated position on a covered pixel. Paddle input on the ticks in between cannot matter
+# and is only applied as the paddle's final position.
+#
+# One ball only: with extra balls, rewind history, a replay being recorded or crash recovery
+# snapshots the game is stepped tick by tick as usual.
+
+MAX_JUMP = 4096  # Ticks scanned per jump; longer flights take several
+MIN_MARGIN = 32
+
+class FastForward:
+    def __init__(self, game):
+        self.game = game
+        self.path = np.empty((2, MAX_JUMP + 1))  # Ball x and y over the scanned ticks
+        self.margin = 0
+        self.bricks = None
+        self.version = None
+        self.active = []
+        self.inputs = None  # The last input sequence played, with its marker positions
+        self.input_array = None
+        self.markers = None
+        self.cover = None
+        self.screen = None  # View of the cover map from the screen origin
+        self.bands = None
+
+    def brick_box(self, brick):
+        # Map slices where the ball centre overlaps the brick
+        radius = self.game.ball.radius
+        margin = self.margin
+        rect = brick.rect
+        return (slice(margin + rect.top - radius + 1, margin + rect.bottom + radius),
+                slice(margin + rect.left - radius + 1, margin + rect.right + radius))
+
+    def build_bands(self, margin):
+        # Walls, the paddle rows and everything off screen, with margin pixels on every side
+        game = self.game
+        radius = game.ball.radius
+        bands = np.ones((game.screen_height + 2 * margin, game.screen_width + 2 * margin), dtype=np.uint8)
+        # Open where the ball centre touches no wall (x > radius and so on) and is above the
+        # first row on which it can reach the paddle
+        bands[margin + radius + 1:margin + int(game.paddle.position.y) - radius + 1,
+              margin + radius + 1:margin + game.screen_width - radius - 1] = 0
+        self.bands = bands
+        self.margin = margin
+
+    def sync(self):
+        # Bring the cover map up to date with the game's bricks. Positions scanned after the first
+        # covered one can lie up to three ticks of travel past the screen, so the margin grows with
+        # the ball's speed.
+        game = self.game
+        velocity = game.ball.velocity
+        margin = max(MIN_MARGIN, int(3 * max(abs(velocity.x), abs(velocity.y))) + 3)
+        if margin > self.margin:
+            self.build_bands(max(margin, 2 * self.margin))
+            self.bricks = None
+        if game.bricks is not self.bricks:
+            self.cover = self.bands.copy()
+            self.screen = self.cover[self.margin:, self.margin:]
+            self.active = [brick.active for brick in game.bricks]
+            for brick, active in zip(game.bricks, self.active):
+                if active:
+                    self.cover[self.brick_box(brick)] += 1
+            self.bricks = game.bricks
+        elif self.version != game.brick_version:
+            for index, brick in enumerate(game.bricks):
+                if brick.active != self.active[index]:
+                    self.set_brick(index, brick.active)
+        self.version = game.brick_version
+
+    def set_brick(self, index, active):
+        self.active[index] = active
+        box = self.brick_box(self.game.bricks[index])
+        if active:
+            self.cover[box] += 1
+        else:
+            self.cover[box] -= 1
+
+    def can_jump(self):
+        game = self.game
+        return (game.current_state == GameState.GAME_RUNNING and game.balls.count == 0 and game.rewind is None
+                and game.replay_recorder is None and game.resume_file is None)
+
+    def quiet_ticks(self, limit):
+        # Ticks from now on which the ball only moves, at most limit, and the ball position after them
+        game = self.game
+        ball = game.ball
+        radius = ball.radius
+        x, y = ball.position.x, ball.position.y
+        vx, vy = ball.velocity.x, ball.velocity.y
+
+        # The scan runs up to the first wall or paddle band pixel, plus a margin for rounding
+        reach = MAX_JUMP
+        if vx < 0:
+            reach = min(reach, (radius + 1 - x) / vx)
+        elif vx > 0:
+            reach = min(reach, (game.screen_width - radius - 1 - x) / vx)
+        if vy < 0:
+            reach = min(reach, (radius + 1 - y) / vy)
+        elif vy > 0:
+            reach = min(reach, (int(game.paddle.position.y) - radius + 1 - y) / vy)
+        count = int(min(limit, max(0, reach) + 2))
+        if count <= 0:
+            return 0, x, y
+
+        path = self.path[:, :count + 1]
+        path[0, 0] = x
+        path[1, 0] = y
+        path[0, 1:] = vx
+        path[1, 1:] = vy
+        np.add.accumulate(path, axis=1, out=path)
+        # The screen view takes negative pixels into the far margin, which is covered like the near
+        # one, and truncation only differs from floor on (-1, 0), which lies on a wall band anyway
+        columns, rows = path[:, 1:].astype(np.intp)
+        covered = self.screen[rows, columns] != 0
+        first = int(covered.argmax())
+        quiet = first if covered[first] else count
+        return quiet, float(path[0, quiet]), float(path[1, quiet])
+
+    def jump(self, limit):
+        # Carries the ball through up to limit quiet ticks; returns how many were skipped
+        if limit <= 0 or not self.can_jump():
+            return 0
+        self.sync()
+        quiet, x, y = self.quiet_ticks(limit)
+        if quiet:
+            game = self.game
+            game.ball.position.update(x, y)
+            game.ticks += quiet
+            game.tick_brick_hit = NO_BRICK
+        return quiet
+
+    def step(self, mouse_x):
+        # One ordinary tick. The brick it broke, if any, is updated in the cover map directly.
+        game = self.game
+        version = game.brick_version
+        game.step(mouse_x)
+        if (game.brick_version == version + 1 and self.version == version and game.bricks is self.bricks
+                and game.tick_brick_hit != NO_BRICK):
+            self.set_brick(game.tick_brick_hit, False)
+            self.version = game.brick_version
+
+    def last_on_screen(self, inputs, start, end):
+        # The last input of a run that moves the paddle, or None
+        width = self.game.screen_width
+        for position in range(end - 1, start - 1, -1):
+            if 0 <= inputs[position] <= width:
+                return int(inputs[position])
+        return None
+
+    def move_paddle(self, inputs, start, end):
+        last = self.last_on_screen(inputs, start, end)
+        if last is not None:
+            self.game.paddle.move(last, self.game.screen_width)
+
+    def play_inputs(self, inputs, position=0, max_ticks=None, restores=None):
+        # Plays replay-style inputs (paddle x per tick, CLICK and RESTORE markers) from position
+        # until max_ticks ticks are played or the inputs run out; returns (position, ticks played)
+        game = self.game
+        if inputs is not self.inputs:
+            self.inputs = inputs
+            self.input_array = np.asarray(inputs)
+            self.markers = np.flatnonzero(self.input_array <= RESTORE)  # CLICK and RESTORE are the lowest values
+        inputs = self.input_array
+        markers = self.markers
+        end = len(inputs)
+        width = game.screen_width
+        ticks = 0
+        while position < end and (max_ticks is None or ticks < max_ticks):
+            mouse_x = inputs[position]
+            if mouse_x == CLICK:
+                game.handle_click()
+                position += 1
+                continue
+            if mouse_x == RESTORE:
+                game.restore_snapshot(restores[position])
+                position += 1
+                continue
+
+            # The run of plain ticks before the next marker
+            next_marker = np.searchsorted(markers, position)
+            run_end = int(markers[next_marker]) if next_marker < len(markers) else end
+            if max_ticks is not None:
+                run_end = min(run_end, position + max_ticks - ticks)
+            run_start = position
+            skipped = None  # First tick jumped over since the paddle last moved
+            while position < run_end and game.current_state == GameState.GAME_RUNNING:
+                quiet = self.jump(run_end - position)
+                if quiet:
+                    if skipped is None:
+                        skipped = position
+                    position += quiet
+                    if position == run_end:
+                        break
+                mouse_x = int(inputs[position])
+                if skipped is not None and not 0 <= mouse_x <= width:
+                    self.move_paddle(inputs, skipped, position)  # This tick leaves the paddle where it was
+                skipped = None
+                self.step(mouse_x)
+                position += 1
+            if skipped is not None:
+                self.move_paddle(inputs, skipped, position)
+            if position < run_end:
+                # The rest of the run is outside play. While the ball waits on the paddle only the
+                # last input that moves it counts, and other states ignore input.
+                if game.current_state == GameState.LEVEL_LOAD:
+                    last = self.last_on_screen(inputs, position, run_end)
+                    if last is not None:
+                        game.step(last)
+                position = run_end
+            ticks += position - run_start
+        return position, ticks
@@ -0,0 +1,257 @@
+import argparse
+import math
+import time
+
+from breakout007 import GameManager, GameState
+
+# Offline level analyzer: brick statistics per level plus a par estimate of the
+# minimum number of paddle hits (and ticks) needed to clear the board.
+
+NUM_LEVELS = 10
+BRICK_WIDTH = 50
+BRICK_HEIGHT = 20
+BRICK_TOP = 50  # y of the first brick row
+MAX_FLIGHT_TICKS = 5000  # Guard against a ball that never comes back down
+
+color_names = {
+    (255, 0, 0): "red",
+    (0, 255, 0): "green",
+    (0, 0, 255): "blue",
+    (255, 165, 0): "orange",
+    (255, 255, 0): "yellow"
+}
+
+class LevelLayout:
+    def __init__(self, level, bricks, speed, screen_width, screen_height, paddle_height, ball_radius):
+        self.level = level
+        self.bricks = bricks
+        self.speed = speed
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.ball_radius = ball_radius
+        self.paddle_top = screen_height - paddle_height
+        self.full_mask = (1 << len(bricks)) - 1
+
+        # Bricks sit on a 50x20 grid, so collisions only need to look at the cells under the ball
+        self.cells = {}
+        for index, brick in enumerate(bricks):
+            self.cells[self.brick_cell(brick)] = index
+        self.rects = [(b.position.x, b.position.y, b.position.x + b.width, b.position.y + b.height) for b in bricks]
+        self.points = [b.points for b in bricks]
+
+    def brick_cell(self, brick):
+        return (int(brick.position.x) // BRICK_WIDTH, (int(brick.position.y) - BRICK_TOP) // BRICK_HEIGHT)
+
+def load_layouts():
+    # Walk a headless game through the real state machine so speeds match what players get
+    game = GameManager(headless=True)
+    layouts = []
+    for level in range(1, NUM_LEVELS + 1):
+        if level > 1:
+            game.change_state(GameState.LEVEL_COMPLETE)
+        game.change_state(GameState.GAME_RUNNING)
+        layouts.append(LevelLayout(level, list(game.bricks), game.ball.speed, game.screen_width,
+                                   game.screen_height, game.paddle.height, game.ball.radius))
+    return layouts
+
+def brick_statistics(layout):
+    counts = {}
+    for brick in layout.bricks:
+        name = color_names.get(brick.color, str(brick.color))
+        counts[name] = counts.get(name, 0) + 1
+    return sum(layout.points), counts
+
+def shielded_bricks(layout):
+    # Bricks the ball cannot touch at the start of the level: flood fill the empty grid cells
+    # connected to the open area below the bricks, and a brick is exposed when it touches one of
+    # those cells. Shielded bricks open up as the bricks in front of them break.
+    columns = layout.screen_width // BRICK_WIDTH
+    rows = max(row for _, row in layout.cells) + 2
+    open_cells = set()
+    stack = [(col, rows - 1) for col in range(columns)]
+    while stack:
+        cell = stack.pop()
+        col, row = cell
+        if cell in open_cells or cell in layout.cells:
+            continue
+        if not (0 <= col < columns and -1 <= row < rows):
+            continue
+        open_cells.add(cell)
+        stack.extend(((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1)))
+
+    shielded = []
+    for (col, row), index in layout.cells.items():
+        neighbours = ((col - 1, row), (col + 1, row), (col, row - 1), (col, row + 1))
+        if not any(n in open_cells for n in neighbours):
+            shielded.append(index)
+    return sorted(shielded)
+
+def collision_side(x, y, vx, vy, rect):
+    # Mirrors GameManager.calculate_collision_side_with_direction
+    left, top, right, bottom = rect
+    if vy > 0:
+        if y < top:
+            return "top"
+    elif vy < 0:
+        if y > bottom:
+            return "bottom"
+    if vx > 0:
+        if x < left:
+            return "left"
+    elif vx < 0:
+        if x > right:
+            return "right"
+    return "top" if y < (top + bottom) / 2 else "bottom"
+
+def simulate_flight(layout, mask, x, y, vx, vy):
+    # Fly the ball with the game's per-tick rules until it is back on the paddle line.
+    # Returns (mask, landing x, ticks); the paddle is assumed to be wherever the ball lands.
+    r = layout.ball_radius
+    speed = layout.speed
+    width = layout.screen_width
+    landing_y = layout.paddle_top - r
+    cells = layout.cells
+    rects = layout.rects
+    for tick in range(1, MAX_FLIGHT_TICKS + 1):
+        x += vx
+        y += vy
+        bounced = False
+        if x <= r:
+            vx, x, bounced = -vx, r, True
+        elif x >= width - r:
+            vx, x, bounced = -vx, width - r, True
+        if y <= r:
+            vy, y, bounced = -vy, r, True
+
+        if vy > 0 and y >= landing_y:
+            return mask, x, tick
+
+        # Ball and bricks: the game resolves only the first active brick in list order
+        left, top = int(x - r), int(y - r)
+        hit = None
+        for col in range(left // BRICK_WIDTH, (left + 2 * r - 1) // BRICK_WIDTH + 1):
+            for row in range((top - BRICK_TOP) // BRICK_HEIGHT, (top + 2 * r - 1 - BRICK_TOP) // BRICK_HEIGHT + 1):
+                index = cells.get((col, row))
+                if index is not None and mask >> index & 1 and (hit is None or index < hit):
+                    hit = index
+        if hit is not None:
+            mask &= ~(1 << hit)
+            side = collision_side(x, y, vx, vy, rects[hit])
+            if (side == "top" and vy > 0) or (side == "bottom" and vy < 0):
+                vy = -vy
+            elif (side == "left" and vx > 0) or (side == "right" and vx < 0):
+                vx = -vx
+            bounced = True
+            if not mask:
+                return mask, x, tick
+
+        if bounced:
+            norm = math.hypot(vx, vy)
+            vx, vy = vx / norm * speed, vy / norm * speed
+    return mask, x, MAX_FLIGHT_TICKS
+
+class ParSolver:
+    def __init__(self, layout, angle_steps=9, beam_width=6, max_hits=500):
+        self.layout = layout
+        self.beam_width = beam_width
+        self.max_hits = max_hits
+        max_angle = math.radians(GameManager.max_bounce_angle)
+        # Same rule as adjust_ball_velocity_for_paddle_collision with offsets spread over the paddle
+        offsets = [i / (angle_steps - 1) - 0.5 for i in range(angle_steps)]
+        self.launches = [(layout.speed * math.sin(max_angle * o * 2), -layout.speed * math.cos(max_angle * o * 2))
+                         for o in offsets]
+        self.flight_cache = {}
+        self.flights = 0
+
+    def flight(self, mask, x, launch):
+        # Landing positions are snapped to whole pixels so equivalent states share cache entries
+        key = (mask, x, launch)
+        result = self.flight_cache.get(key)
+        if result is None:
+            vx, vy = self.launches[launch]
+            new_mask, land_x, ticks = simulate_flight(self.layout, mask, x, self.layout.paddle_top - self.layout.ball_radius, vx, vy)
+            result = (new_mask, int(round(land_x)), ticks)
+            self.flight_cache[key] = result
+            self.flights += 1
+        return result
+
+    def solve(self):
+        layout = self.layout
+        # The serve leaves from the paddle centre with the game's initial (speed, -speed) velocity
+        x = layout.screen_width // 2
+        mask, land_x, ticks = simulate_flight(layout, layout.full_mask, x, layout.paddle_top - layout.ball_radius - 1,
+                                              layout.speed, -layout.speed)
+        if not mask:
+            return 0, ticks
+
+        # Beam search over paddle hits; each state is (bricks left, landing x) and keeps the fewest ticks
+        frontier = {(mask, int(round(land_x))): ticks}
+        for hits in range(1, self.max_hits + 1):
+            children = {}
+            for (mask, x), elapsed in frontier.items():
+                for launch in range(len(self.launches)):
+                    new_mask, land_x, ticks = self.flight(mask, x, launch)
+                    if new_mask == mask:
+                        continue  # Wasted bounce, never part of a shortest clear
+                    if not new_mask:
+                        return hits, elapsed + ticks
+                    key = (new_mask, land_x)
+                    if key not in children or elapsed + ticks < children[key]:
+                        children[key] = elapsed + ticks
+            if not children:
+                return None, None
+
+            # Prune: drop duplicate masks, then keep the states with the fewest bricks left
+            best_by_mask = {}
+            for (mask, x), elapsed in children.items():
+                if mask not in best_by_mask or elapsed < best_by_mask[mask][1]:
+                    best_by_mask[mask] = (x, elapsed)
+            ranked = sorted(best_by_mask.items(), key=lambda item: (bin(item[0]).count("1"), item[1][1]))
+            frontier = {(mask, x): elapsed for mask, (x, elapsed) in ranked[:self.beam_width]}
+        return None, None
+
+def analyze(levels=None, angle_steps=9, beam_width=6):
+    results = []
+    for layout in load_layouts():
+        if levels and layout.level not in levels:
+            continue
+        start = time.perf_counter()
+        total_points, counts = brick_statistics(layout)
+        shielded = shielded_bricks(layout)
+        solver = ParSolver(layout, angle_steps=angle_steps, beam_width=beam_width)
+        par_hits, par_ticks = solver.solve()
+        results.append({
+            "level": layout.level,
+            "bricks": len(layout.bricks),
+            "total_points": total_points,
+            "bricks_by_color": counts,
+            "shielded_bricks": len(shielded),
+            "ball_speed": layout.speed,
+            "par_paddle_hits": par_hits,
+            "par_ticks": par_ticks,
+            "par_seconds": par_ticks / 60 if par_ticks is not None else None,
+            "flights_simulated": solver.flights,
+            "solve_seconds": time.perf_counter() - start
+        })
+    return results
+
+def print_report(results):
+    print(f"{'Level':>5} {'Bricks':>6} {'Points':>6} {'Shielded':>8} {'Speed':>6} {'Par hits':>8} {'Par time':>8}  Colors")
+    for r in results:
+        par_hits = r["par_paddle_hits"] if r["par_paddle_hits"] is not None else "-"
+        par_time = f"{r['par_seconds']:.1f}s" if r["par_seconds"] is not None else "-"
+        colors = ", ".join(f"{name} {count}" for name, count in sorted(r["bricks_by_color"].items()))
+        print(f"{r['level']:>5} {r['bricks']:>6} {r['total_points']:>6} {r['shielded_bricks']:>8} "
+              f"{r['ball_speed']:>6.2f} {par_hits:>8} {par_time:>8}  {colors}")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze Breakout levels and estimate par paddle hits.")
+    parser.add_argument("--level", type=int, action="append", help="Level to analyze (repeatable, default all)")
+    parser.add_argument("--angles", type=int, default=9, help="Number of paddle bounce angles to try")
+    parser.add_argument("--beam", type=int, default=6, help="States kept per paddle hit")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print_report(analyze(args.level, args.angles, args.beam))
+    print(f"Analyzed in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,294 @@
+import math
+
+import numpy as np
+
+# Extra balls for multiball and ball storm play. GameManager.ball stays the main ball and keeps
+# its own collision code; every other ball lives in the columns of one preallocated array and
+# is moved and tested against the walls, paddle and bricks in a single NumPy pass per tick.
+# Collisions use the same rect overlap and side rules as check_collisions.
+#
+# Balls also bounce off each other. The broad phase is sweep and prune on x: the balls are kept
+# in x order from tick to tick, so re-sorting nearly sorted data is close to linear, and only
+# neighbours less than a diameter apart in x become candidate pairs. The narrow phase is the
+# exact circle test, and touching balls that are closing exchange the velocity component along
+# the line between their centres, as equal masses do in an elastic collision.
+
+TOP = 0
+BOTTOM = 1
+LEFT = 2
+RIGHT = 3
+
+class BallArray:
+    def __init__(self, capacity, radius=10):
+        self.capacity = capacity
+        self.radius = radius
+        self.count = 0
+        self.state = np.zeros((4, capacity))  # Rows: x, y, vx, vy
+        self.x, self.y, self.vx, self.vy = self.state
+        self.order = np.arange(capacity)  # Ball indices by x, carried over between ticks
+        # Brick rects of the current level and which are active, synced to game.brick_version
+        self.bricks = None
+        self.version = None
+        self.left = self.top = self.right = self.bottom = self.centery = None
+        self.active = None
+        self.bricks_bottom = 0
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, x, y, speed, angles):
+        # One ball per angle (radians from straight up), as many as there is room for
+        count = min(len(angles), self.capacity - self.count)
+        start = self.count
+        end = start + count
+        angles = np.asarray(angles[:count], dtype=np.float64)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = speed * np.sin(angles)
+        self.vy[start:end] = -speed * np.cos(angles)
+        self.order[start:end] = np.arange(start, end)  # New balls are sorted in on the next pass
+        self.count = end
+        return count
+
+    def spread(self, x, y, speed, count, max_angle):
+        # count balls fanned evenly across the paddle's bounce angles
+        limit = math.radians(max_angle)
+        return self.add(x, y, speed, np.linspace(-limit, limit, count + 2)[1:-1])
+
+    def remove(self, keep):
+        # Drops the balls whose keep flag is off, keeping the rest in order
+        count = self.count
+        kept = int(keep.sum())
+        if kept != count:
+            self.state[:, :kept] = self.state[:, :count][:, keep]
+            # Renumber the x order instead of losing it
+            order = self.order[:count]
+            self.order[:kept] = (np.cumsum(keep) - 1)[order[keep[order]]]
+            self.count = kept
+
+    def pop_first(self, ball):
+        # Moves the oldest extra ball into a Ball object, for when the main ball is lost
+        ball.position.update(self.x[0], self.y[0])
+        ball.velocity.update(self.vx[0], self.vy[0])
+        keep = np.ones(self.count, dtype=bool)
+        keep[0] = False
+        self.remove(keep)
+
+    def save(self, state):
+        if state.ball_data is None or state.ball_data.shape != self.state.shape:
+            state.ball_data = np.empty_like(self.state)
+        state.ball_data[:, :self.count] = self.state[:, :self.count]
+        state.ball_count = self.count
+
+    def load(self, state):
+        self.count = state.ball_count
+        self.state[:, :self.count] = state.ball_data[:, :self.count]
+        self.order[:self.count] = np.arange(self.count)
+
+    def pack(self):
+        # The balls as little-endian doubles, x row first, for game snapshots
+        return self.state[:, :self.count].astype('<f8').tobytes()
+
+    def unpack(self, data, count):
+        self.count = count
+        self.state[:, :count] = np.frombuffer(data, dtype='<f8', count=4 * count).reshape(4, count)
+        self.order[:count] = np.arange(count)
+
+    def sync_bricks(self, game):
+        if game.bricks is not self.bricks:
+            rects = np.array([tuple(brick.rect) for brick in game.bricks], dtype=np.float64).reshape(-1, 4)
+            self.left = rects[:, 0]
+            self.top = rects[:, 1]
+            self.right = rects[:, 0] + rects[:, 2]
+            self.bottom = rects[:, 1] + rects[:, 3]
+            self.centery = rects[:, 1] + rects[:, 3] // 2
+            self.bricks_bottom = self.bottom.max() if len(rects) else 0
+            self.bricks = game.bricks
+            self.version = None
+        if self.version != game.brick_version:
+            self.active = np.fromiter((brick.active for brick in game.bricks), dtype=bool,
+                                      count=len(game.bricks))
+            self.version = game.brick_version
+
+    def step(self, game):
+        # Moves every extra ball one tick and resolves its collisions; returns the number lost
+        count = self.count
+        if count == 0:
+            return 0
+        radius = self.radius
+        speed = game.ball.speed
+        x = self.x[:count]
+        y = self.y[:count]
+        vx = self.vx[:count]
+        vy = self.vy[:count]
+        x += vx
+        y += vy
+
+        # Walls, with the same nudges as check_collisions
+        left = x <= radius
+        right = ~left & (x >= game.screen_width - radius)
+        top = y <= radius
+        vx[left | right] *= -1
+        x[left] = radius
+        x[right] = game.screen_width - radius
+        vy[top] *= -1
+        y[top] = radius
+        bounced = left | right | top
+        if bounced.any():
+            game.wall_paddle_bounce_sound.play()
+
+        # Ball squares truncated like the Rect constructor, as in update_ball_rect
+        size = 2 * radius
+        ball_left = np.trunc(x - radius)
+        ball_top = np.trunc(y - radius)
+
+        # Paddle
+        paddle = game.paddle
+        paddle_left = int(paddle.position.x)
+        paddle_top = int(paddle.position.y)
+        on_paddle = ((ball_left < paddle_left + paddle.width) & (ball_left + size > paddle_left) &
+                     (ball_top < paddle_top + paddle.height) & (ball_top + size > paddle_top))
+        hits = np.flatnonzero(on_paddle)
+        if len(hits):
+            sides = collision_sides(x[hits], y[hits], vx[hits], vy[hits], paddle_left, paddle_top,
+                                    paddle_left + paddle.width, paddle_top + paddle.height,
+                                    paddle_top + paddle.height // 2)
+            bounce = hits[(sides == TOP) & (vy[hits] > 0)]
+            offset = (x[bounce] - paddle.position.x) / paddle.width - 0.5
+            angle = math.radians(game.max_bounce_angle) * offset * 2
+            vx[bounce] = speed * np.sin(angle)
+            vy[bounce] = -speed * np.cos(angle)
+            vx[hits[(sides == LEFT) | (sides == RIGHT)]] *= -1
+            game.wall_paddle_bounce_sound.play()
+
+        # Bricks: the first active brick in list order for each ball, tested for the balls that
+        # reach the brick rows against the bricks as they are after the main ball's turn
+        self.sync_bricks(game)
+        near = np.flatnonzero(ball_top < self.bricks_bottom)
+        if len(near) and self.active.any():
+            bricks = np.flatnonzero(self.active)
+            near_left = ball_left[near, None]
+            near_top = ball_top[near, None]
+            overlap = ((near_left < self.right[bricks]) & (near_left + size > self.left[bricks]) &
+                       (near_top < self.bottom[bricks]) & (near_top + size > self.top[bricks]))
+            hit_any = overlap.any(axis=1)
+            if hit_any.any():
+                hits = near[hit_any]
+                targets = bricks[overlap[hit_any].argmax(axis=1)]
+                sides = collision_sides(x[hits], y[hits], vx[hits], vy[hits], self.left[targets],
+                                        self.top[targets], self.right[targets], self.bottom[targets],
+                                        self.centery[targets])
+                flip_y = ((sides == TOP) & (vy[hits] > 0)) | ((sides == BOTTOM) & (vy[hits] < 0))
+                flip_x = ((sides == LEFT) & (vx[hits] > 0)) | ((sides == RIGHT) & (vx[hits] < 0))
+                vy[hits[flip_y]] *= -1
+                vx[hits[flip_x]] *= -1
+                bounced[hits] = True
+                # Every ball bounces off the brick it touched, but a brick shared by several balls
+                # breaks and scores once, for the lowest numbered ball
+                broken = None
+                for brick_index in targets[np.sort(np.unique(targets, return_index=True)[1])].tolist():
+                    brick = game.bricks[brick_index]
+                    if brick.active:
+                        game.break_brick(brick)
+                        broken = brick
+                self.active[targets] = False
+                self.version = game.brick_version
+                if broken is not None:
+                    game.play_brick_sound(broken.color)
+
+        # Keep the speed exact after reflections, as normalize_ball_velocity does
+        self.normalize(np.flatnonzero(bounced), speed)
+
+        # Balls below the screen are gone
+        keep = y - radius <= game.screen_height
+        lost = self.count - int(keep.sum())
+        if lost:
+            self.remove(np.concatenate([keep, np.ones(self.count - count, dtype=bool)]))
+        return lost
+
+    def normalize(self, indices, speed):
+        if len(indices):
+            scale = speed / np.hypot(self.vx[indices], self.vy[indices])
+            self.vx[indices] *= scale
+            self.vy[indices] *= scale
+
+    def candidate_pairs(self):
+        # Broad phase: pairs of balls closer than a diameter in x, as (lower index, higher index)
+        count = self.count
+        order = self.order[:count]
+        order[:] = order[np.argsort(self.x[order], kind="stable")]  # Timsort: near linear when nearly sorted
+        xs = self.x[order]
+        ends = np.searchsorted(xs, xs + 2 * self.radius, side="left")
+        spans = ends - np.arange(count) - 1
+        total = int(spans.sum())
+        if total == 0:
+            return None
+        first = np.repeat(np.arange(count), spans)
+        steps = np.arange(total) - np.repeat(np.cumsum(spans) - spans, spans) + 1
+        a = order[first]
+        b = order[first + steps]
+        return np.minimum(a, b), np.maximum(a, b)
+
+    def collide(self, game):
+        # Ball against ball, extra balls among themselves and against the main ball
+        count = self.count
+        if count == 0:
+            return
+        speed = game.ball.speed
+        x = self.x[:count]
+        y = self.y[:count]
+        vx = self.vx[:count]
+        vy = self.vy[:count]
+        reach = (2 * self.radius) ** 2
+        touched = np.zeros(count, dtype=bool)
+
+        pairs = self.candidate_pairs()
+        if pairs is not None:
+            a, b = pairs
+            dx = x[b] - x[a]
+            dy = y[b] - y[a]
+            distance = dx * dx + dy * dy
+            # Touching, not concentric, and closing along the line between the centres
+            closing = (dx * (vx[a] - vx[b]) + dy * (vy[a] - vy[b])) > 0
+            hit = np.flatnonzero((distance < reach) & (distance > 0) & closing)
+            if len(hit):
+                # Pairs are applied in index order, so the result does not depend on the x order
+                hit = hit[np.lexsort((b[hit], a[hit]))]
+                a, b, dx, dy, distance = a[hit], b[hit], dx[hit], dy[hit], distance[hit]
+                # Velocities before any exchange this tick, so every pair sees the same state
+                exchange = ((vx[a] - vx[b]) * dx + (vy[a] - vy[b]) * dy) / distance
+                ex = exchange * dx
+                ey = exchange * dy
+                np.subtract.at(vx, a, ex)
+                np.subtract.at(vy, a, ey)
+                np.add.at(vx, b, ex)
+                np.add.at(vy, b, ey)
+                touched[a] = True
+                touched[b] = True
+
+        # The main ball against every extra ball; one ball needs no broad phase
+        ball = game.ball
+        dx = x - ball.position.x
+        dy = y - ball.position.y
+        distance = dx * dx + dy * dy
+        closing = (dx * (ball.velocity.x - vx) + dy * (ball.velocity.y - vy)) > 0
+        hits = np.flatnonzero((distance < reach) & (distance > 0) & closing)
+        if len(hits):
+            exchange = ((ball.velocity.x - vx[hits]) * dx[hits] + (ball.velocity.y - vy[hits]) * dy[hits]) / distance[hits]
+            ex = exchange * dx[hits]
+            ey = exchange * dy[hits]
+            vx[hits] += ex
+            vy[hits] += ey
+            ball.velocity.x -= float(ex.sum())
+            ball.velocity.y -= float(ey.sum())
+            touched[hits] = True
+            game.normalize_ball_velocity()
+
+        if touched.any():
+            self.normalize(np.flatnonzero(touched), speed)
+            game.bounce_sound.play()
+
+def collision_sides(x, y, vx, vy, left, top, right, bottom, centery):
+    # calculate_collision_side_with_direction for arrays of balls and rects
+    return np.select([(vy > 0) & (y < top), (vy < 0) & (y > bottom), (vx > 0) & (x < left), (vx < 0) & (x > right),
+                      y < centery], [TOP, BOTTOM, LEFT, RIGHT, TOP], BOTTOM)
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Observations for learning agents, drawn straight from game state into small NumPy arrays.
+# Nothing here touches pygame surfaces: bricks come from a per-env brick grid that is gathered
+# up to the output resolution with precomputed index maps, the ball is a precomputed stamp and
+# the paddle a column mask, each done for the whole batch at once.
+
+BRICK_WIDTH = 50
+BRICK_HEIGHT = 20
+BRICK_TOP = 50  # y of the first brick row; the grid starts here
+PLANES = 3  # Grid observation planes: bricks, ball, paddle
+
+def brick_gray(color):
+    # Luminance, so brick colours stay distinguishable in grayscale
+    red, green, blue = color
+    return max(1, int(round(0.299 * red + 0.587 * green + 0.114 * blue)))
+
+class ObservationRenderer:
+    def __init__(self, width=84, height=84, screen_width=800, screen_height=600, paddle_height=15,
+                 ball_radius=10):
+        self.width = width
+        self.height = height
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.ball_radius = ball_radius
+        self.grid_rows = -(-(screen_height - BRICK_TOP) // BRICK_HEIGHT)  # Last row reaches the paddle
+        self.grid_columns = screen_width // BRICK_WIDTH
+        self.layouts = {}  # level -> (rows, columns, gray) for every brick index
+        self.grid_cache = {}  # id(game) -> (bricks, brick_version, grid)
+
+        # Output pixel -> brick grid cell, sampled at pixel centres
+        x_centres = (np.arange(width) + 0.5) * screen_width / width
+        y_centres = (np.arange(height) + 0.5) * screen_height / height
+        self.pixel_columns = np.minimum(x_centres // BRICK_WIDTH, self.grid_columns - 1).astype(np.intp)
+        self.brick_row = int(np.searchsorted(y_centres, BRICK_TOP))  # First output row inside the grid
+        self.pixel_rows = ((y_centres[self.brick_row:] - BRICK_TOP) // BRICK_HEIGHT).astype(np.intp)
+        self.x_centres = x_centres
+        self.paddle_row = int(np.searchsorted(y_centres, screen_height - paddle_height))
+
+        # Ball stamp: coverage of the ball disc on the output grid, supersampled 4x per pixel
+        scale_x = width / screen_width
+        scale_y = height / screen_height
+        half_w = int(np.ceil(ball_radius * scale_x)) + 1
+        half_h = int(np.ceil(ball_radius * scale_y)) + 1
+        sub = (np.arange(4) + 0.5) / 4
+        xs = ((np.arange(-half_w, half_w + 1)[:, None] + sub[None, :]).ravel() - 0.5) / scale_x
+        ys = ((np.arange(-half_h, half_h + 1)[:, None] + sub[None, :]).ravel() - 0.5) / scale_y
+        inside = (xs[None, :] ** 2 + ys[:, None] ** 2) <= ball_radius ** 2
+        coverage = inside.reshape(2 * half_h + 1, 4, 2 * half_w + 1, 4).mean(axis=(1, 3))
+        self.stamp = (coverage * 255).astype(np.uint8)
+        self.stamp_rows = np.arange(-half_h, half_h + 1)
+        self.stamp_columns = np.arange(-half_w, half_w + 1)
+
+    def level_layout(self, game):
+        layout = self.layouts.get(game.level)
+        if layout is None or len(layout[0]) != len(game.bricks):
+            bricks = game.bricks
+            rows = np.array([(int(b.position.y) - BRICK_TOP) // BRICK_HEIGHT for b in bricks], dtype=np.intp)
+            columns = np.array([int(b.position.x) // BRICK_WIDTH for b in bricks], dtype=np.intp)
+            gray = np.array([brick_gray(b.color) for b in bricks], dtype=np.uint8)
+            layout = (rows, columns, gray)
+            self.layouts[game.level] = layout
+        return layout
+
+    def brick_grid(self, game):
+        # Grayscale brick grid for one env, rebuilt only when a brick changed since the last call
+        cached = self.grid_cache.get(id(game))
+        if cached is not None and cached[0] is game.bricks and cached[1] == game.brick_version:
+            return cached[2]
+        rows, columns, gray = self.level_layout(game)
+        mask = np.fromiter((brick.active for brick in game.bricks), dtype=bool, count=len(game.bricks))
+        grid = np.zeros((self.grid_rows, self.grid_columns), dtype=np.uint8)
+        grid[rows[mask], columns[mask]] = gray[mask]
+        self.grid_cache[id(game)] = (game.bricks, game.brick_version, grid)
+        return grid
+
+    def gather(self, games):
+        # Batch state arrays: brick grids, ball centres, paddle left edges and widths
+        count = len(games)
+        grids = np.empty((count, self.grid_rows, self.grid_columns), dtype=np.uint8)
+        balls = np.empty((count, 2))
+        paddles = np.empty((count, 2))
+        for index, game in enumerate(games):
+            grids[index] = self.brick_grid(game)
+            balls[index] = game.ball.position.x, game.ball.position.y
+            paddles[index] = game.paddle.position.x, game.paddle.width
+        return grids, balls, paddles
+
+    def render_state(self, grids, balls, paddles, out=None):
+        # (N, height, width) uint8 frames from batch state arrays
+        count = len(grids)
+        if out is None:
+            out = np.empty((count, self.height, self.width), dtype=np.uint8)
+        out[:, :self.brick_row] = 0
+        out[:, self.brick_row:] = grids[:, self.pixel_rows[:, None], self.pixel_columns[None, :]]
+
+        # Paddle: every pixel column whose centre lies over the paddle, on the bottom rows
+        left = paddles[:, 0:1]
+        covered = (self.x_centres >= left) & (self.x_centres < left + paddles[:, 1:2])
+        paddle_pixels = out[:, self.paddle_row:, :]
+        paddle_pixels[np.broadcast_to(covered[:, None, :], paddle_pixels.shape)] = 255
+
+        # Ball: the stamp placed at each centre, clipped at the frame edges
+        centre_columns = np.floor(balls[:, 0] * self.width / self.screen_width).astype(np.intp)
+        centre_rows = np.floor(balls[:, 1] * self.height / self.screen_height).astype(np.intp)
+        rows = centre_rows[:, None, None] + self.stamp_rows[None, :, None]
+        columns = centre_columns[:, None, None] + self.stamp_columns[None, None, :]
+        envs = np.broadcast_to(np.arange(count)[:, None, None], (count,) + self.stamp.shape)
+        rows, columns = np.broadcast_arrays(rows, columns)
+        stamp = np.broadcast_to(self.stamp, rows.shape)
+        visible = (rows >= 0) & (rows < self.height) & (columns >= 0) & (columns < self.width) & (stamp > 0)
+        envs, rows, columns = envs[visible], rows[visible], columns[visible]
+        out[envs, rows, columns] = np.maximum(out[envs, rows, columns], stamp[visible])
+        return out
+
+    def render(self, games, out=None):
+        return self.render_state(*self.gather(games), out=out)
+
+    def grid_state(self, grids, balls, paddles, out=None):
+        # (N, 3, grid rows, grid columns) uint8 planes at brick resolution: brick gray levels,
+        # the cell holding the ball centre, and the paddle's coverage of each bottom-row cell
+        count = len(grids)
+        if out is None:
+            out = np.empty((count, PLANES, self.grid_rows, self.grid_columns), dtype=np.uint8)
+        out[:, 0] = grids
+        out[:, 1:] = 0
+        envs = np.arange(count)
+        ball_rows = np.clip((balls[:, 1] - BRICK_TOP) // BRICK_HEIGHT, 0, self.grid_rows - 1).astype(np.intp)
+        ball_columns = np.clip(balls[:, 0] // BRICK_WIDTH, 0, self.grid_columns - 1).astype(np.intp)
+        out[envs, 1, ball_rows, ball_columns] = 255
+        cell_left = np.arange(self.grid_columns) * BRICK_WIDTH
+        overlap = (np.minimum(cell_left + BRICK_WIDTH, (paddles[:, 0] + paddles[:, 1])[:, None]) -
+                   np.maximum(cell_left, paddles[:, 0:1]))
+        out[:, 2, -1, :] = (np.clip(overlap, 0, BRICK_WIDTH) * 255 / BRICK_WIDTH).astype(np.uint8)
+        return out
+
+    def grid_planes(self, games, out=None):
+        return self.grid_state(*self.gather(games), out=out)
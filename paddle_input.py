@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pygame
+
+# Paddle input. Motion events are drained again right before each physics tick, so the
+# paddle uses the newest position rather than the one seen at the top of the frame.
+# Relative mode grabs the mouse and integrates raw motion instead of reading the cursor.
+# Every motion event is kept with its arrival time in a preallocated ring; the latency
+# measurement reads the oldest sample a frame has not shown yet from it.
+
+LATENCY_HISTORY = 4096  # Frames kept for the latency percentiles
+SAMPLE_HISTORY = 1024  # Motion samples kept
+
+class PaddleInput:
+    def __init__(self, screen_width, relative=False, sensitivity=1.0, measure=False):
+        self.screen_width = screen_width
+        self.relative = relative
+        self.sensitivity = sensitivity
+        self.measure = measure
+        self.x = screen_width // 2
+        self.sample_times = np.zeros(SAMPLE_HISTORY)
+        self.sample_xs = np.zeros(SAMPLE_HISTORY)
+        self.sample_count = 0  # Motion events so far; the ring holds the newest SAMPLE_HISTORY
+        self.presented = 0  # sample_count when the last frame was shown
+        self.latencies = np.zeros(LATENCY_HISTORY)
+        self.latency_count = 0
+        if relative:
+            pygame.mouse.set_visible(False)
+            pygame.event.set_grab(True)
+
+    def motion(self, event):
+        now = time.perf_counter()
+        if self.relative:
+            x = self.x + event.rel[0] * self.sensitivity
+            self.x = max(0, min(self.screen_width, x))
+        else:
+            self.x = event.pos[0]
+        index = self.sample_count % SAMPLE_HISTORY
+        self.sample_times[index] = now
+        self.sample_xs[index] = self.x
+        self.sample_count += 1
+
+    def sample(self):
+        # Called immediately before physics: pick up motion that arrived during the frame
+        for event in pygame.event.get(pygame.MOUSEMOTION):
+            self.motion(event)
+        if not self.relative:
+            self.x = pygame.mouse.get_pos()[0]
+        return int(self.x)
+
+    def frame_presented(self):
+        # Called right after display.flip: the input consumed this frame is now visible
+        if self.sample_count > self.presented:
+            if self.measure:
+                # Arrival time of the oldest sample not yet on screen, or of the oldest still kept
+                oldest = max(self.presented, self.sample_count - SAMPLE_HISTORY)
+                latency = time.perf_counter() - self.sample_times[oldest % SAMPLE_HISTORY]
+                self.latencies[self.latency_count % LATENCY_HISTORY] = latency
+                self.latency_count += 1
+            self.presented = self.sample_count
+
+    def latency_percentiles(self, percentiles=(50, 90, 95, 99)):
+        count = min(self.latency_count, LATENCY_HISTORY)
+        if count == 0:
+            return {}
+        values = np.percentile(self.latencies[:count] * 1000, percentiles)
+        return dict(zip(percentiles, values))
+
+    def latency_report(self):
+        results = self.latency_percentiles()
+        if not results:
+            return "Input latency: no motion measured"
+        parts = ", ".join(f"p{p} {ms:.1f} ms" for p, ms in results.items())
+        return f"Input-to-flip latency over {min(self.latency_count, LATENCY_HISTORY)} frames: {parts}"
@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+
+APP_NAME = "Breakout"
+
+def user_data_dir():
+    # Per-user location for saved data, following each platform's convention
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+        path = os.path.join(base, APP_NAME)
+    elif sys.platform == "darwin":
+        path = os.path.join(os.path.expanduser("~"), "Library", "Application Support", APP_NAME)
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+        path = os.path.join(base, APP_NAME.lower())
+    return path
+
+def atomic_write_json(path, data):
+    # Write to a temp file in the same directory and rename it over the target, so a crash
+    # mid-write leaves either the old file or the new one, never a truncated one
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def read_json(path):
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+            return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        return None
+
+class StatsFile:
+    # A small JSON document owned by a background thread. The game only touches the
+    # in-memory copy; loading and every write happen off the main thread.
+    def __init__(self, filename="stats.json", directory=None, legacy_paths=()):
+        self.path = os.path.join(directory or user_data_dir(), filename)
+        self.legacy_paths = legacy_paths
+        self.data = {}
+        self.pending = {}
+        self.loaded = threading.Event()
+        self.closing = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.writer_loop, name="stats-writer", daemon=True)
+        self.thread.start()
+
+    def get(self, key, default=None):
+        with self.condition:
+            return self.data.get(key, default)
+
+    def update(self, **values):
+        # Pending updates are merged, so a burst of changes costs a single write
+        with self.condition:
+            self.data.update(values)
+            self.pending.update(values)
+            self.condition.notify()
+
+    def close(self, timeout=5):
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+    def load(self):
+        data = read_json(self.path)
+        if data is None:
+            # Fall back to a stats file left behind by older builds
+            for legacy_path in self.legacy_paths:
+                data = read_json(legacy_path)
+                if data is not None:
+                    break
+        with self.condition:
+            # Anything set before the load finished wins over the file contents
+            self.data = {**(data or {}), **self.data}
+            if data and not os.path.exists(self.path):
+                self.pending.update(self.data)
+        self.loaded.set()
+
+    def writer_loop(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        except OSError:
+            pass  # Reported when the first write fails
+        self.load()
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closing)
+                if not self.pending and self.closing:
+                    return
+                self.pending = {}
+                snapshot = dict(self.data)
+            try:
+                atomic_write_json(self.path, snapshot)
+            except OSError as error:
+                print(f"Could not save stats to {self.path}: {error}", file=sys.stderr)
+
+def atomic_write_bytes(path, data):
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".bin", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def drop_partial_line(path):
+    # For append-only result files: cut a last line left unfinished by an interrupted run, so
+    # the next append starts on a fresh line
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as file:
+        data = file.read()
+        if data and not data.endswith(b"\n"):
+            file.truncate(data.rfind(b"\n") + 1)
+
+class SnapshotFile:
+    # Keeps the newest game snapshot on disk for quit-and-resume and crash recovery.
+    # Only the latest payload matters, so older unwritten ones are simply replaced.
+    def __init__(self, filename="resume.bin", directory=None):
+        self.path = os.path.join(directory or user_data_dir(), filename)
+        self.data = None
+        self.pending = None
+        self.remove_pending = False
+        self.closing = False
+        self.loaded = threading.Event()
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.writer_loop, name="snapshot-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, data):
+        with self.condition:
+            self.data = data
+            self.pending = data
+            self.remove_pending = False
+            self.condition.notify()
+
+    def clear(self):
+        with self.condition:
+            self.data = None
+            self.pending = None
+            self.remove_pending = True
+            self.condition.notify()
+
+    def close(self, timeout=5):
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+    def writer_loop(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except OSError:
+            data = None
+        with self.condition:
+            if self.data is None and not self.remove_pending:
+                self.data = data
+        self.loaded.set()
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or self.remove_pending or self.closing)
+                data, remove = self.pending, self.remove_pending
+                self.pending, self.remove_pending = None, False
+                if data is None and not remove:
+                    return
+            try:
+                if remove:
+                    if os.path.exists(self.path):
+                        os.remove(self.path)
+                else:
+                    atomic_write_bytes(self.path, data)
+            except OSError as error:
+                print(f"Could not save snapshot to {self.path}: {error}", file=sys.stderr)
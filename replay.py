@@ -0,0 +1,395 @@
+import argparse
+import bisect
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from persistence import user_data_dir
+
+# Replay files: a header holding the game snapshot taken when recording started, followed by
+# a stream of varint-encoded input records. The low two bits of each record are its tag:
+#   TAG_TICK      one update_game_state tick, paddle x stored as a zigzag delta from the last tick
+#   TAG_CLICK     a left click handled by handle_click
+#   TAG_IDLE      a run of ticks whose paddle x did not change, with the run length
+#   TAG_EXTENDED  the remaining bits pick the record kind:
+#     EXT_END       end of the stream, followed by the final score, tick count and level reached
+#     EXT_KEYFRAME  replay tick, paddle x and a game snapshot to restart playback from
+#     EXT_RESTORE   a game snapshot playback must jump to, written when the player rewinds
+# Version 2 files end with an index of keyframe offsets and a fixed-size footer, which lets a
+# replay be opened at a keyframe without decoding the stream before it; version 3 adds the level
+# reached to the end record.
+REPLAY_MAGIC = b'BKRP'
+REPLAY_VERSION = 3
+REPLAY_HEADER = struct.Struct('<4sBH')  # magic, version, snapshot length
+REPLAY_FOOTER = struct.Struct('<IQ4s')  # keyframe count, index offset, magic
+INDEX_MAGIC = b'BKIX'
+REPLAY_EXTENSION = '.bkr'
+
+TAG_TICK = 0
+TAG_CLICK = 1
+TAG_IDLE = 2
+TAG_EXTENDED = 3
+EXT_END = 0
+EXT_KEYFRAME = 1
+EXT_RESTORE = 2
+
+# Markers in the expanded input array, outside any paddle x
+CLICK = -32768
+RESTORE = -32767
+FLUSH_BYTES = 4096
+KEYFRAME_INTERVAL = 600  # Ticks between keyframes, so a seek simulates at most 10 seconds
+
+def replay_dir():
+    return os.path.join(user_data_dir(), "replays")
+
+def write_varint(buffer, value):
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+class ReplayWriter:
+    # Appends encoded chunks to the replay file on a background thread
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.writer_loop, name="replay-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, chunk):
+        self.queue.put(bytes(chunk))
+
+    def close(self):
+        self.queue.put(None)
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def writer_loop(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            file = open(self.path, 'wb')
+        except OSError as error:
+            print(f"Could not record replay to {self.path}: {error}", file=sys.stderr)
+            file = None
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            if file is not None:
+                file.write(chunk)
+        if file is not None:
+            file.close()
+
+class ReplayRecorder:
+    # Collects input on the main thread; encoding is a few integer operations per tick
+    def __init__(self, snapshot, writer, keyframe_interval=KEYFRAME_INTERVAL):
+        self.writer = writer
+        self.buffer = bytearray(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(snapshot)))
+        self.buffer += snapshot
+        self.written = 0  # Bytes already handed to the writer
+        self.last_x = 0
+        self.idle_ticks = 0
+        self.ticks = 0
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = []  # (replay tick, byte offset)
+
+    def record_tick(self, mouse_x):
+        self.ticks += 1
+        delta = mouse_x - self.last_x
+        if delta == 0:
+            self.idle_ticks += 1
+            return
+        self.flush_idle()
+        self.last_x = mouse_x
+        write_varint(self.buffer, zigzag(delta) << 2 | TAG_TICK)
+        if len(self.buffer) >= FLUSH_BYTES:
+            self.flush()
+
+    def record_click(self):
+        self.flush_idle()
+        self.buffer.append(TAG_CLICK)
+
+    def flush_idle(self):
+        if self.idle_ticks:
+            write_varint(self.buffer, self.idle_ticks << 2 | TAG_IDLE)
+            self.idle_ticks = 0
+
+    def keyframe_due(self):
+        last_tick = self.keyframes[-1][0] if self.keyframes else 0
+        return self.ticks - last_tick >= self.keyframe_interval
+
+    def record_keyframe(self, snapshot):
+        self.flush_idle()
+        self.keyframes.append((self.ticks, self.written + len(self.buffer)))
+        write_varint(self.buffer, EXT_KEYFRAME << 2 | TAG_EXTENDED)
+        write_varint(self.buffer, self.ticks)
+        write_varint(self.buffer, zigzag(self.last_x))
+        write_varint(self.buffer, len(snapshot))
+        self.buffer += snapshot
+
+    def record_restore(self, snapshot):
+        self.flush_idle()
+        write_varint(self.buffer, EXT_RESTORE << 2 | TAG_EXTENDED)
+        write_varint(self.buffer, len(snapshot))
+        self.buffer += snapshot
+
+    def flush(self):
+        self.written += len(self.buffer)
+        self.writer.write(self.buffer)
+        self.buffer = bytearray()
+
+    def finish(self, score, ticks, level):
+        self.flush_idle()
+        write_varint(self.buffer, EXT_END << 2 | TAG_EXTENDED)
+        write_varint(self.buffer, score)
+        write_varint(self.buffer, ticks)
+        write_varint(self.buffer, level)
+
+        index_offset = self.written + len(self.buffer)
+        for tick, offset in self.keyframes:
+            write_varint(self.buffer, tick)
+            write_varint(self.buffer, offset)
+        self.buffer += REPLAY_FOOTER.pack(len(self.keyframes), index_offset, INDEX_MAGIC)
+        self.flush()
+        self.writer.close()
+
+def new_replay_path():
+    name = time.strftime("replay-%Y%m%d-%H%M%S") + f"-{os.getpid()}{REPLAY_EXTENSION}"
+    return os.path.join(replay_dir(), name)
+
+class Replay:
+    def __init__(self, snapshot, inputs, keyframes, final_score=None, final_ticks=None, final_level=None,
+                 restores=None, start_tick=0):
+        self.snapshot = snapshot
+        self.start_tick = start_tick  # Replay tick of snapshot; later than 0 when opened at a keyframe
+        self.inputs = inputs  # One entry per frame: paddle x for a tick, CLICK or RESTORE otherwise
+        self.restores = restores or {}  # Input position of each RESTORE -> snapshot
+        self.keyframes = keyframes  # Sorted (replay tick, input position, snapshot)
+        self.keyframe_ticks = [tick for tick, _, _ in keyframes]
+        self.final_score = final_score
+        self.final_ticks = final_ticks
+        self.final_level = final_level
+        self.total_ticks = sum(1 for value in inputs if value != CLICK and value != RESTORE)
+
+def read_keyframe_index(data):
+    # Keyframe (tick, byte offset) pairs from the footer, without decoding the input stream
+    if len(data) < REPLAY_HEADER.size + REPLAY_FOOTER.size:
+        return None
+    count, index_offset, magic = REPLAY_FOOTER.unpack_from(data, len(data) - REPLAY_FOOTER.size)
+    if magic != INDEX_MAGIC:
+        return None
+    index = []
+    offset = index_offset
+    for _ in range(count):
+        tick, offset = read_varint(data, offset)
+        position, offset = read_varint(data, offset)
+        index.append((tick, position))
+    return index
+
+def parse_replay(data, start_tick=0):
+    # With start_tick, decoding starts at the last indexed keyframe at or before it, and the
+    # replay holds only the input from there on
+    magic, version, snapshot_length = REPLAY_HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC or not 1 <= version <= REPLAY_VERSION:
+        raise ValueError("Not a compatible replay file")
+    offset = REPLAY_HEADER.size
+    snapshot = bytes(data[offset:offset + snapshot_length])
+    offset += snapshot_length
+    first_tick = 0
+    if start_tick > 0:
+        index = read_keyframe_index(data) or []
+        position = bisect.bisect_right([tick for tick, _ in index], start_tick) - 1
+        if position >= 0:
+            first_tick, offset = index[position]
+
+    inputs = array('h')
+    keyframes = []
+    restores = {}
+    mouse_x = 0
+    final_score = final_ticks = final_level = None
+    end = len(data)
+    while offset < end:
+        value, offset = read_varint(data, offset)
+        tag = value & 3
+        if tag == TAG_TICK:
+            mouse_x += unzigzag(value >> 2)
+            inputs.append(mouse_x)
+        elif tag == TAG_IDLE:
+            inputs.extend([mouse_x] * (value >> 2))
+        elif tag == TAG_CLICK:
+            inputs.append(CLICK)
+        elif value >> 2 == EXT_KEYFRAME:
+            tick, offset = read_varint(data, offset)
+            paddle_x, offset = read_varint(data, offset)
+            mouse_x = unzigzag(paddle_x)  # The delta base when decoding starts here
+            length, offset = read_varint(data, offset)
+            keyframes.append((tick, len(inputs), bytes(data[offset:offset + length])))
+            offset += length
+        elif value >> 2 == EXT_RESTORE:
+            length, offset = read_varint(data, offset)
+            restores[len(inputs)] = bytes(data[offset:offset + length])
+            inputs.append(RESTORE)
+            offset += length
+        else:
+            final_score, offset = read_varint(data, offset)
+            final_ticks, offset = read_varint(data, offset)
+            if version >= 3:
+                final_level, offset = read_varint(data, offset)
+            break
+    if first_tick:
+        snapshot = keyframes[0][2]
+    return Replay(snapshot, inputs, keyframes, final_score, final_ticks, final_level, restores, first_tick)
+
+def load_replay(path, start_tick=0):
+    with open(path, 'rb') as file:
+        return parse_replay(file.read(), start_tick)
+
+class ReplayPlayer:
+    # Plays a replay on a headless game, with seeking through the embedded keyframes
+    def __init__(self, replay, game=None, fast=False):
+        from breakout007 import GameManager
+        from fast_forward import FastForward
+
+        self.replay = replay
+        self.game = game if game is not None else GameManager(headless=True)
+        # Fast playback jumps over ticks where the ball only moves; see fast_forward.py
+        self.fast_forward = FastForward(self.game) if fast else None
+        self.seek(0)
+
+    def seek(self, tick):
+        # Restore the nearest keyframe at or before the tick, then simulate the remainder
+        replay = self.replay
+        index = bisect.bisect_right(replay.keyframe_ticks, tick) - 1
+        if index >= 0:
+            self.tick, self.position, snapshot = replay.keyframes[index]
+        else:
+            self.tick, self.position, snapshot = replay.start_tick, 0, replay.snapshot
+        self.game.restore_snapshot(snapshot)
+        self.advance(tick - self.tick)
+
+    def advance(self, ticks):
+        # Simulate up to the given number of ticks, applying clicks on the way
+        if self.fast_forward is not None:
+            self.position, played = self.fast_forward.play_inputs(self.replay.inputs, self.position, ticks,
+                                                                  self.replay.restores)
+            self.tick += played
+            return self.tick
+        game = self.game
+        inputs = self.replay.inputs
+        position = self.position
+        end = len(inputs)
+        target = self.tick + ticks
+        tick = self.tick
+        while tick < target and position < end:
+            mouse_x = inputs[position]
+            position += 1
+            if mouse_x == CLICK:
+                game.handle_click()
+            elif mouse_x == RESTORE:
+                game.restore_snapshot(self.replay.restores[position - 1])
+            else:
+                game.step(mouse_x)
+                tick += 1
+        self.position = position
+        self.tick = tick
+        return tick
+
+    def finished(self):
+        return self.position >= len(self.replay.inputs)
+
+def play_replay(replay, game=None, fast=False):
+    player = ReplayPlayer(replay, game, fast)
+    player.advance(replay.total_ticks)
+    return player.game
+
+def verify_replay(path, fast=False):
+    replay = load_replay(path)
+    game = play_replay(replay, fast=fast)
+    return replay.final_score is not None and game.score == replay.final_score, game.score, replay.final_score
+
+FAST_FORWARD_SPEEDS = [1, 2, 4, 8, 16, 32, 64]
+
+def watch_replay(path, start_seconds=0):
+    # Windowed viewer. Up/Down change the fast-forward speed, Left/Right seek 10 seconds and
+    # Space pauses. At N times speed only every Nth tick is drawn. Starting part way in opens the
+    # replay at the nearest keyframe, so seeks stay within the part after it.
+    import pygame
+
+    start_tick = start_seconds * 60
+    player = ReplayPlayer(load_replay(path, start_tick))
+    player.seek(start_tick)
+    game = player.game
+    pygame.init()
+    game.screen = pygame.display.set_mode((game.screen_width, game.screen_height))
+    pygame.display.set_caption(f"Breakout Replay - {os.path.basename(path)}")
+    game.font = pygame.font.SysFont(None, 24)
+    clock = pygame.time.Clock()
+    speed_index = 0
+    paused = False
+    seek_ticks = 600
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_UP:
+                    speed_index = min(speed_index + 1, len(FAST_FORWARD_SPEEDS) - 1)
+                elif event.key == pygame.K_DOWN:
+                    speed_index = max(speed_index - 1, 0)
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.tick + seek_ticks)
+                elif event.key == pygame.K_LEFT:
+                    player.seek(max(player.tick - seek_ticks, player.replay.start_tick))
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+
+        if not paused and not player.finished():
+            player.advance(FAST_FORWARD_SPEEDS[speed_index])
+        game.draw_game_screen()
+        status = f"x{FAST_FORWARD_SPEEDS[speed_index]}  {player.tick // 60}s / {(player.replay.start_tick + player.replay.total_ticks) // 60}s"
+        if paused:
+            status += "  paused"
+        game.screen.blit(game.font.render(status, True, (255, 255, 255)), (5, game.screen_height - 20))
+        pygame.display.flip()
+        clock.tick(60)
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or watch Breakout replays.")
+    parser.add_argument("replays", nargs="+", help="Replay files")
+    parser.add_argument("--watch", action="store_true", help="Play the first replay in a window")
+    parser.add_argument("--fast", action="store_true", help="Verify with the event-driven fast-forward")
+    parser.add_argument("--start", type=int, default=0, help="Seconds into the replay to start watching at")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_replay(args.replays[0], args.start)
+    else:
+        for replay_path in args.replays:
+            matches, score, claimed = verify_replay(replay_path, args.fast)
+            status = "OK" if matches else "MISMATCH"
+            print(f"{status} {replay_path}: replayed score {score}, recorded score {claimed}")
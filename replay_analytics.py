@@ -0,0 +1,183 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from replay import load_replay, play_replay
+
+# Batch replay analytics. Replays are re-simulated headlessly in a process pool while a
+# ReplayEventLog collects paddle contact offsets, brick destruction order and the x position
+# where the ball was lost. Each replay is turned into histograms in one vectorized pass.
+
+NUM_LEVELS = 10
+GRID_COLUMNS = 16
+GRID_ROWS = 18  # Level 10 uses the most rows
+BRICK_WIDTH = 50
+BRICK_HEIGHT = 20
+BRICK_TOP = 50
+OFFSET_EDGES = np.linspace(-0.6, 0.6, 49)  # The ball can touch the paddle slightly past its ends
+DEATH_EDGES = np.linspace(0, 800, 81)
+LEVEL_EDGES = np.arange(0.5, NUM_LEVELS + 1.5)
+
+class ReplayEventLog:
+    # Attached to GameManager.analytics; appends a few numbers per event, never per tick
+    def __init__(self):
+        self.paddle_levels = []
+        self.paddle_offsets = []
+        self.brick_levels = []
+        self.brick_columns = []
+        self.brick_rows = []
+        self.brick_orders = []
+        self.death_levels = []
+        self.death_xs = []
+        self.bricks_in_level = 1
+        self.bricks_hit = 0
+
+    def level_loaded(self, level, brick_count):
+        self.bricks_in_level = max(brick_count, 1)
+        self.bricks_hit = 0
+
+    def paddle_hit(self, level, offset):
+        self.paddle_levels.append(level)
+        self.paddle_offsets.append(offset)
+
+    def brick_hit(self, level, position):
+        self.brick_levels.append(level)
+        self.brick_columns.append(int(position.x) // BRICK_WIDTH)
+        self.brick_rows.append((int(position.y) - BRICK_TOP) // BRICK_HEIGHT)
+        # Destruction order as a fraction of the level, so layouts of any size compare
+        self.brick_orders.append(self.bricks_hit / self.bricks_in_level)
+        self.bricks_hit += 1
+
+    def ball_lost(self, level, x):
+        self.death_levels.append(level)
+        self.death_xs.append(x)
+
+def empty_totals():
+    grid = (NUM_LEVELS + 1, GRID_ROWS, GRID_COLUMNS)
+    return {
+        "replays": np.zeros(1, dtype=np.int64),
+        "paddle_offsets": np.zeros((NUM_LEVELS, len(OFFSET_EDGES) - 1), dtype=np.int64),
+        "death_x": np.zeros((NUM_LEVELS, len(DEATH_EDGES) - 1), dtype=np.int64),
+        "brick_hits": np.zeros(grid, dtype=np.int64),
+        "brick_order_sum": np.zeros(grid, dtype=np.float64)
+    }
+
+def histogram_log(log):
+    # All of one replay's events at once
+    totals = empty_totals()
+    totals["replays"][0] = 1
+    if log.paddle_offsets:
+        totals["paddle_offsets"] += np.histogram2d(log.paddle_levels, log.paddle_offsets,
+                                                   bins=[LEVEL_EDGES, OFFSET_EDGES])[0].astype(np.int64)
+    if log.death_xs:
+        totals["death_x"] += np.histogram2d(log.death_levels, np.clip(log.death_xs, 0, 799.999),
+                                            bins=[LEVEL_EDGES, DEATH_EDGES])[0].astype(np.int64)
+    if log.brick_orders:
+        levels = np.asarray(log.brick_levels)
+        rows = np.clip(log.brick_rows, 0, GRID_ROWS - 1)
+        columns = np.clip(log.brick_columns, 0, GRID_COLUMNS - 1)
+        np.add.at(totals["brick_hits"], (levels, rows, columns), 1)
+        np.add.at(totals["brick_order_sum"], (levels, rows, columns), log.brick_orders)
+    return totals
+
+def merge_totals(totals, other):
+    for key, value in other.items():
+        totals[key] += value
+    return totals
+
+# Worker side: one archive mapping per process, opened on first use
+worker_archives = {}
+
+def analyze_source(source):
+    from breakout007 import GameManager
+
+    path, number = source
+    if number is None:
+        replay = load_replay(path)
+    else:
+        from replay_archive import ReplayArchive
+
+        archive = worker_archives.get(path)
+        if archive is None:
+            archive = worker_archives[path] = ReplayArchive(path)
+        replay = archive.load_replay(number)
+
+    game = GameManager(headless=True)
+    game.analytics = ReplayEventLog()
+    play_replay(replay, game)
+    return histogram_log(game.analytics)
+
+def replay_sources(paths):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend((p, None) for p in sorted(glob.glob(os.path.join(path, "*.bkr"))))
+        elif path.endswith(".bkr"):
+            sources.append((path, None))
+        else:
+            from replay_archive import ReplayArchive
+
+            with ReplayArchive(path) as archive:
+                sources.extend((path, int(number)) for number in range(len(archive)))
+    return sources
+
+def analyze_replays(sources, processes=None, chunksize=8):
+    totals = empty_totals()
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(analyze_source, sources, chunksize=chunksize):
+            merge_totals(totals, result)
+    return totals
+
+def heatmap_colors(values):
+    # Black to red to yellow to white, scaled to the array's own maximum
+    peak = values.max()
+    scaled = values / peak if peak > 0 else values
+    red = np.clip(scaled * 3, 0, 1)
+    green = np.clip(scaled * 3 - 1, 0, 1)
+    blue = np.clip(scaled * 3 - 2, 0, 1)
+    return (np.stack([red, green, blue], axis=-1) * 255).astype(np.uint8)
+
+def save_heatmap(path, values, cell_width, cell_height):
+    import pygame
+
+    pixels = heatmap_colors(np.asarray(values, dtype=np.float64))
+    pixels = np.repeat(np.repeat(pixels, cell_height, axis=0), cell_width, axis=1)
+    # surfarray indexes by (x, y)
+    pygame.image.save(pygame.surfarray.make_surface(pixels.transpose(1, 0, 2)), path)
+
+def write_outputs(totals, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    hits = totals["brick_hits"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_order = np.where(hits > 0, totals["brick_order_sum"] / hits, 0.0)
+    np.savez_compressed(os.path.join(output_dir, "replay_analytics.npz"), offset_edges=OFFSET_EDGES,
+                        death_edges=DEATH_EDGES, brick_mean_order=mean_order, **totals)
+
+    # One row per level for the paddle and death histograms, one grid per level for the bricks
+    save_heatmap(os.path.join(output_dir, "paddle_offsets.png"), totals["paddle_offsets"], 10, 20)
+    save_heatmap(os.path.join(output_dir, "death_x.png"), totals["death_x"], 10, 20)
+    for level in range(1, NUM_LEVELS + 1):
+        if hits[level].any():
+            save_heatmap(os.path.join(output_dir, f"level_{level}_brick_hits.png"), hits[level],
+                         BRICK_WIDTH, BRICK_HEIGHT)
+            # Early-destroyed bricks show bright, so invert the mean order for the image
+            save_heatmap(os.path.join(output_dir, f"level_{level}_destruction_order.png"),
+                         np.where(hits[level] > 0, 1 - mean_order[level], 0), BRICK_WIDTH, BRICK_HEIGHT)
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate paddle, brick and death statistics from replays.")
+    parser.add_argument("replays", nargs="+", help="Replay files, directories of replays or replay archives")
+    parser.add_argument("--output", default="replay_analytics", help="Directory for the .npz and PNG files")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sources = replay_sources(args.replays)
+    totals = analyze_replays(sources, args.processes)
+    write_outputs(totals, args.output)
+    print(f"Analyzed {int(totals['replays'][0])} replays in {time.perf_counter() - start:.1f}s into {args.output}")
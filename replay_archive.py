@@ -0,0 +1,245 @@
+import argparse
+import getpass
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from replay import parse_replay, play_replay
+
+# Replay archive: many replay files packed into one append-only file.
+#   header   magic, version, entry count, index capacity, index offset
+#   index    a region of fixed-size entries (offset, length, score, ticks, level, time, player)
+#   replays  the replay files themselves, each stored as written by ReplayRecorder
+# New replays are appended after everything else and their entries go into free slots of the
+# index region; the header count is rewritten last, so a crash mid-append leaves the archive
+# as it was. When the index region is full it is copied to a region twice the size at the end.
+ARCHIVE_MAGIC = b'BKAR'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('<4sIIIQ')  # magic, version, count, capacity, index offset
+ARCHIVE_ENTRY = struct.Struct('<QIIIB3xd32s')  # offset, length, score, ticks, level, recorded at, player
+INITIAL_INDEX_CAPACITY = 256
+
+# The same entry layout as a NumPy record, so the index can be queried in place
+ENTRY_DTYPE = np.dtype({
+    'names': ['offset', 'length', 'final_score', 'ticks', 'level_reached', 'recorded_at', 'player'],
+    'formats': ['<u8', '<u4', '<u4', '<u4', 'u1', '<f8', 'S32'],
+    'offsets': [0, 8, 12, 16, 20, 24, 32],
+    'itemsize': ARCHIVE_ENTRY.size
+})
+
+def replay_summary(data):
+    # Archive metadata for a finished replay
+    replay = parse_replay(data)
+    return replay.final_score or 0, replay.final_ticks or 0, replay.final_level or 0
+
+class ReplayArchive:
+    # Read-only view of an archive. The index and every replay are slices of one mmap.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, capacity, index_offset = ARCHIVE_HEADER.unpack_from(self.map, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError("Not a compatible replay archive")
+        self.index = np.frombuffer(self.map, dtype=ENTRY_DTYPE, count=count, offset=index_offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def replay_data(self, number):
+        # A memoryview into the mapping; nothing is copied until it is parsed
+        entry = self.index[number]
+        start = int(entry['offset'])
+        return memoryview(self.map)[start:start + int(entry['length'])]
+
+    def load_replay(self, number):
+        return parse_replay(self.replay_data(number))
+
+    def player(self, number):
+        return self.index[number]['player'].decode('utf-8', 'replace')
+
+    def select(self, min_level=None, min_score=None, player=None, min_ticks=None, max_ticks=None):
+        # Entry numbers matching every given condition, answered from the index alone
+        mask = np.ones(len(self.index), dtype=bool)
+        if min_level is not None:
+            mask &= self.index['level_reached'] >= min_level
+        if min_score is not None:
+            mask &= self.index['final_score'] >= min_score
+        if player is not None:
+            mask &= self.index['player'] == player.encode('utf-8')[:32]
+        if min_ticks is not None:
+            mask &= self.index['ticks'] >= min_ticks
+        if max_ticks is not None:
+            mask &= self.index['ticks'] <= max_ticks
+        return np.flatnonzero(mask)
+
+    def close(self):
+        self.index = None  # Release the buffer export before unmapping
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # Replays still being read keep the mapping alive until they are released
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ReplayArchiveWriter:
+    # Appends replays on a background thread. One writer per archive file.
+    def __init__(self, path, player=None):
+        self.path = path
+        self.player = player or getpass.getuser()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.writer_loop, name="archive-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, data, player=None):
+        self.queue.put((bytes(data), player or self.player))
+
+    def sink(self, player=None):
+        # A ReplayWriter stand-in for GameManager.start_replay_recording
+        return ArchiveSink(self, player)
+
+    def flush(self):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def writer_loop(self):
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            replays = [item for item in batch if isinstance(item, tuple)]
+            if replays:
+                try:
+                    append_replays(self.path, replays)
+                except (OSError, ValueError) as error:
+                    print(f"Could not archive {len(replays)} replays to {self.path}: {error}", file=sys.stderr)
+            for item in batch:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    item.set()
+
+class ArchiveSink:
+    # Buffers one recording and hands it to the archive writer when the recorder closes it
+    def __init__(self, archive_writer, player=None):
+        self.archive_writer = archive_writer
+        self.player = player
+        self.chunks = []
+        self.done = threading.Event()
+
+    def write(self, chunk):
+        self.chunks.append(bytes(chunk))
+
+    def close(self):
+        self.archive_writer.add(b''.join(self.chunks), self.player)
+        self.chunks = []
+        self.done.set()
+
+    def join(self, timeout=None):
+        self.done.wait(timeout)
+
+def create_archive(path, capacity=INITIAL_INDEX_CAPACITY):
+    with open(path, 'wb') as file:
+        index_offset = ARCHIVE_HEADER.size
+        file.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, capacity, index_offset))
+        file.write(bytes(capacity * ARCHIVE_ENTRY.size))
+
+def append_replays(path, replays):
+    # replays: list of (replay bytes, player name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        create_archive(path)
+    with open(path, 'r+b') as file:
+        magic, version, count, capacity, index_offset = ARCHIVE_HEADER.unpack(file.read(ARCHIVE_HEADER.size))
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError("Not a compatible replay archive")
+
+        entries = []
+        end = file.seek(0, os.SEEK_END)
+        now = time.time()
+        for data, player in replays:
+            score, ticks, level = replay_summary(data)
+            file.write(data)
+            entries.append(ARCHIVE_ENTRY.pack(end, len(data), score, ticks, level, now,
+                                              player.encode('utf-8')[:32]))
+            end += len(data)
+
+        if count + len(entries) > capacity:
+            # Move the index to a bigger region at the end; the old region becomes dead space
+            file.seek(index_offset)
+            old_entries = file.read(count * ARCHIVE_ENTRY.size)
+            capacity = max(capacity * 2, count + len(entries))
+            index_offset = end
+            file.seek(index_offset)
+            file.write(old_entries)
+            file.write(bytes((capacity - count) * ARCHIVE_ENTRY.size))
+        file.seek(index_offset + count * ARCHIVE_ENTRY.size)
+        file.write(b''.join(entries))
+        file.flush()
+        os.fsync(file.fileno())
+
+        # Publish the new entries only once everything they point at is on disk
+        file.seek(0)
+        file.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, count + len(entries), capacity, index_offset))
+        file.flush()
+        os.fsync(file.fileno())
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack, query and verify Breakout replay archives.")
+    parser.add_argument("archive", help="Archive file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack = subparsers.add_parser("pack", help="Append replay files to the archive")
+    pack.add_argument("replays", nargs="+")
+    pack.add_argument("--player", default=None)
+    query = subparsers.add_parser("query", help="List archived replays")
+    query.add_argument("--min-level", type=int)
+    query.add_argument("--min-score", type=int)
+    query.add_argument("--player")
+    verify = subparsers.add_parser("verify", help="Re-simulate archived replays and check their scores")
+    verify.add_argument("numbers", nargs="*", type=int)
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        player = args.player or getpass.getuser()
+        batch = []
+        for replay_path in args.replays:
+            with open(replay_path, 'rb') as replay_file:
+                batch.append((replay_file.read(), player))
+        append_replays(args.archive, batch)
+        print(f"Archived {len(batch)} replays")
+    else:
+        with ReplayArchive(args.archive) as archive:
+            if args.command == "query":
+                numbers = archive.select(args.min_level, args.min_score, args.player)
+                for number in numbers:
+                    entry = archive.index[number]
+                    print(f"{number:>6} {archive.player(number):<16} score {entry['final_score']:>6} "
+                          f"level {entry['level_reached']:>2} ticks {entry['ticks']:>8}")
+                print(f"{len(numbers)} of {len(archive)} replays")
+            else:
+                for number in args.numbers or range(len(archive)):
+                    replay = archive.load_replay(number)
+                    game = play_replay(replay)
+                    status = "OK" if game.score == replay.final_score else "MISMATCH"
+                    print(f"{status} {number}: replayed score {game.score}, recorded score {replay.final_score}")
@@ -0,0 +1,65 @@
+import struct
+
+# Rewind history: one fixed-size record per GAME_RUNNING tick in a preallocated ring buffer.
+# A record holds the state after the tick plus the index of the brick broken during it and
+# whether the ball hit the paddle, so stepping back restores the previous record, re-activates
+# that one brick and takes both hits back out of the session statistics.
+REWIND_RECORD = struct.Struct('<6dIIh?')  # ball x, y, vx, vy, speed, paddle x, score, ticks, brick, paddle hit
+NO_BRICK = -1
+REWIND_SECONDS = 30
+TICKS_PER_SECOND = 60
+
+class RewindBuffer:
+    def __init__(self, seconds=REWIND_SECONDS, ticks_per_second=TICKS_PER_SECOND):
+        self.capacity = seconds * ticks_per_second
+        self.buffer = bytearray(self.capacity * REWIND_RECORD.size)
+        self.record_size = REWIND_RECORD.size
+        self.pack_into = REWIND_RECORD.pack_into
+        self.head = 0  # Slot for the next record
+        self.count = 0
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def record(self, game, brick_index, paddle_hit):
+        # Hot path, once per tick: a single pack_into into the preallocated buffer
+        ball = game.ball
+        position = ball.position
+        velocity = ball.velocity
+        head = self.head
+        self.pack_into(self.buffer, head * self.record_size, position.x, position.y, velocity.x, velocity.y,
+                       ball.speed, game.paddle.position.x, game.score, game.ticks, brick_index, paddle_hit)
+        head += 1
+        self.head = head if head < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def rewind(self, game):
+        # Undo the newest tick; returns False when there is no older state left
+        if self.count < 2:
+            return False
+        size = REWIND_RECORD.size
+        newest = (self.head - 1) % self.capacity
+        brick_index, paddle_hit = REWIND_RECORD.unpack_from(self.buffer, newest * size)[8:]
+        if brick_index != NO_BRICK:
+            brick = game.bricks[brick_index]
+            brick.active = True
+            game.brick_version += 1
+            game.bricks_broken -= 1  # Breaking it again must not bring the next power-up closer
+            if game.session is not None:
+                game.session.brick_hit(brick.color, -1)
+        if paddle_hit and game.session is not None:
+            game.session.paddle_hit(game.ball.speed, -1)
+        self.head = newest
+        self.count -= 1
+
+        previous = (newest - 1) % self.capacity
+        x, y, vx, vy, speed, paddle_x, score, ticks, _, _ = REWIND_RECORD.unpack_from(self.buffer, previous * size)
+        game.ball.position.update(x, y)
+        game.ball.velocity.update(vx, vy)
+        game.ball.speed = speed
+        game.paddle.position.x = paddle_x
+        game.score = score
+        game.ticks = ticks
+        return True
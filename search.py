@@ -0,0 +1,169 @@
+import numpy as np
+
+from breakout007 import GameState, SimulationState
+
+# Branching helpers for search-based agents, built on GameManager.clone/restore. The paddle
+# only matters on the tick the ball reaches it, so evaluating many paddle positions shares
+# everything up to that tick and simulates each distinct outcome of it once.
+
+class PaddleEvaluator:
+    # Keeps its scratch states between calls, so a decision loop allocates no game state
+    def __init__(self):
+        self.root = SimulationState()
+        self.contact = SimulationState()
+
+    def approaching(self, game):
+        # True when the next tick can put the ball on the paddle
+        ball = game.ball
+        return (ball.velocity.y > 0 and
+                ball.position.y + ball.velocity.y + ball.radius >= game.paddle.position.y)
+
+    def run_until_contact(self, game, mouse_x, horizon, leaving=False):
+        # Steps until the ball is about to reach the paddle, the state leaves GAME_RUNNING or
+        # horizon ticks pass; returns the ticks stepped. Right after a contact tick (leaving) the
+        # ball may still be falling past the paddle, so it only counts as approaching again once
+        # it has gone back up; a missed ball falls until it is lost.
+        start = game.ticks
+        while game.current_state == GameState.GAME_RUNNING and game.ticks - start < horizon:
+            if leaving:
+                leaving = game.ball.velocity.y >= 0
+            elif self.approaching(game):
+                break
+            game.step(mouse_x)
+        return game.ticks - start
+
+    def evaluate(self, game, candidates, horizon=600):
+        # For each candidate mouse x held from now on: whether the ball is still in play, the
+        # points scored and ticks played until it comes back to the paddle (or the level ends
+        # or horizon ticks pass), and where it comes back. The game is left as it was.
+        candidates = np.asarray(candidates, dtype=np.float64)
+        count = len(candidates)
+        alive = np.ones(count, dtype=bool)
+        points = np.zeros(count, dtype=np.int64)
+        ticks = np.zeros(count, dtype=np.int64)
+        landing_x = np.full(count, np.nan)
+        if count == 0 or game.current_state != GameState.GAME_RUNNING:
+            return alive, points, ticks, landing_x
+
+        # Hooks that record play would see the branches, so they sit this out, and a branch that
+        # ends the game must not touch the high score or the resume file
+        hooks = (game.session, game.analytics, game.replay_recorder, game.rewind, game.stats, game.resume_file,
+                 game.session_high_score)
+        game.session = game.analytics = game.replay_recorder = game.rewind = game.stats = game.resume_file = None
+        root = game.clone(self.root)
+        try:
+            # Shared prefix: the paddle cannot touch the ball before the contact tick
+            prefix = self.run_until_contact(game, float(candidates[0]), horizon)
+            prefix_points = game.score - root.score
+            if game.current_state != GameState.GAME_RUNNING or prefix >= horizon:
+                alive[:] = game.current_state != GameState.GAME_OVER
+                points[:] = prefix_points
+                ticks[:] = prefix
+                return alive, points, ticks, landing_x
+            contact = game.clone(self.contact)
+
+            # Candidates that clamp to the same paddle spot play out identically, and so do all
+            # candidates too far from the ball to touch it while it falls past the paddle
+            paddle = game.paddle
+            ball = game.ball
+            width = game.screen_width
+            lefts = np.clip(candidates - paddle.width // 2, 0, width - paddle.width)
+            in_range = (candidates >= 0) & (candidates <= width)  # Others leave the paddle where it is
+            lefts = np.where(in_range, lefts, paddle.position.x)
+            passing_ticks = np.ceil((2 * ball.radius + paddle.height) / ball.velocity.y) + 1
+            reach = abs(ball.velocity.x) * passing_ticks + ball.radius + 1
+            misses = (lefts > ball.position.x + reach) | (lefts + paddle.width < ball.position.x - reach)
+            outcome = np.where(misses, -1.0, lefts)
+            outcomes, first, inverse = np.unique(outcome, return_index=True, return_inverse=True)
+
+            branch_alive = np.empty(len(outcomes), dtype=bool)
+            branch_points = np.empty(len(outcomes), dtype=np.int64)
+            branch_ticks = np.empty(len(outcomes), dtype=np.int64)
+            branch_landing = np.full(len(outcomes), np.nan)
+            for branch, index in enumerate(first):
+                game.restore(contact)
+                mouse_x = float(candidates[index])
+                game.step(mouse_x)  # The contact tick
+                rest = self.run_until_contact(game, mouse_x, horizon - prefix - 1, leaving=True) + 1
+                branch_alive[branch] = game.current_state != GameState.GAME_OVER
+                branch_points[branch] = game.score - root.score
+                branch_ticks[branch] = prefix + rest
+                if game.current_state == GameState.GAME_RUNNING and self.approaching(game):
+                    branch_landing[branch] = game.ball.position.x
+            alive[:] = branch_alive[inverse]
+            points[:] = branch_points[inverse]
+            ticks[:] = branch_ticks[inverse]
+            landing_x[:] = branch_landing[inverse]
+            return alive, points, ticks, landing_x
+        finally:
+            game.restore(root)
+            (game.session, game.analytics, game.replay_recorder, game.rewind, game.stats, game.resume_file,
+             game.session_high_score) = hooks
+
+def evaluate_paddle_positions(game, candidates, horizon=600):
+    return PaddleEvaluator().evaluate(game, candidates, horizon)
+
+def play_candidate(game, mouse_x, horizon=600):
+    # Tick by tick reference for PaddleEvaluator.evaluate: holds mouse_x until the ball has come
+    # off the paddle and is about to reach it again, the game leaves GAME_RUNNING or horizon
+    # ticks pass. Returns (alive, points, ticks, landing x) and leaves the game where it stopped.
+    start_score = game.score
+    start_ticks = game.ticks
+    paddle = game.paddle
+    ball = game.ball
+    phase = 0  # 0 before the contact tick, 1 until the ball goes back up, 2 on its way up
+    while game.current_state == GameState.GAME_RUNNING and game.ticks - start_ticks < horizon:
+        approaching = (ball.velocity.y > 0 and
+                       ball.position.y + ball.velocity.y + ball.radius >= paddle.position.y)
+        if phase == 0 and approaching:
+            phase = 1
+        elif phase == 1 and ball.velocity.y < 0:
+            phase = 2
+        elif phase == 2 and approaching:
+            break
+        game.step(mouse_x)
+    landing_x = np.nan
+    if game.current_state == GameState.GAME_RUNNING and phase == 2:
+        landing_x = ball.position.x
+    return game.current_state != GameState.GAME_OVER, game.score - start_score, game.ticks - start_ticks, landing_x
+
+def check_evaluator(positions=20, candidates=200, horizon=600):
+    # Compares evaluate with play_candidate for every candidate at the first positions
+    # approaches of an autopilot game; returns the number of mismatching candidates
+    from autopilot import PredictiveAutopilot
+    from breakout007 import GameManager
+
+    game = GameManager(headless=True)
+    autopilot = PredictiveAutopilot()
+    evaluator = PaddleEvaluator()
+    root = SimulationState()
+    xs = np.linspace(-20, game.screen_width + 20, candidates)
+    game.handle_click()
+    checked = mismatches = 0
+    was_approaching = False
+    while checked < positions and game.current_state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
+        if game.current_state == GameState.LEVEL_LOAD:
+            game.handle_click()
+            continue
+        approaching = evaluator.approaching(game)
+        if approaching and not was_approaching:
+            alive, points, ticks, landing_x = evaluator.evaluate(game, xs, horizon)
+            game.clone(root)
+            for index, mouse_x in enumerate(xs):
+                expected = play_candidate(game, float(mouse_x), horizon)
+                game.restore(root)
+                if ((alive[index], points[index], ticks[index]) != expected[:3] or
+                        not np.array_equal(landing_x[index], expected[3], equal_nan=True)):
+                    mismatches += 1
+            checked += 1
+        was_approaching = approaching
+        game.step(autopilot.paddle_x(game))
+    return mismatches
+
+# Main execution
+if __name__ == "__main__":
+    import sys
+
+    failures = check_evaluator()
+    print(f"{'PASS' if not failures else 'FAIL'}: {failures} paddle candidates differ from stepping the game")
+    sys.exit(1 if failures else 0)
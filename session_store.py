@@ -0,0 +1,247 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from persistence import user_data_dir
+
+# Session and per-level statistics in SQLite. Games fill in a SessionRecorder in memory and
+# hand finished sessions to a SessionStore, whose writer thread batches them into the database.
+
+BRICK_COLORS = {
+    (255, 0, 0): "red",
+    (0, 255, 0): "green",
+    (0, 0, 255): "blue",
+    (255, 165, 0): "orange",
+    (255, 255, 0): "yellow"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    final_score INTEGER NOT NULL,
+    level_reached INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    cause_of_death TEXT,
+    death_x REAL,
+    paddle_hits INTEGER NOT NULL,
+    max_ball_speed REAL NOT NULL,
+    total_ticks INTEGER NOT NULL,
+    headless INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_levels (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    level INTEGER NOT NULL,
+    cleared INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    paddle_hits INTEGER NOT NULL,
+    max_ball_speed REAL NOT NULL,
+    bricks_red INTEGER NOT NULL,
+    bricks_green INTEGER NOT NULL,
+    bricks_blue INTEGER NOT NULL,
+    bricks_orange INTEGER NOT NULL,
+    bricks_yellow INTEGER NOT NULL,
+    PRIMARY KEY (session_id, level)
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (final_score DESC);
+CREATE INDEX IF NOT EXISTS session_levels_by_level ON session_levels (level, cleared);
+"""
+
+SESSION_COLUMNS = ("started_at", "ended_at", "final_score", "level_reached", "outcome", "cause_of_death",
+                   "death_x", "paddle_hits", "max_ball_speed", "total_ticks", "headless")
+LEVEL_COLUMNS = ("session_id", "level", "cleared", "ticks", "score", "paddle_hits", "max_ball_speed",
+                 "bricks_red", "bricks_green", "bricks_blue", "bricks_orange", "bricks_yellow")
+
+def default_database_path():
+    return os.path.join(user_data_dir(), "sessions.db")
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash safe for the database file
+    connection.executescript(SCHEMA)
+    return connection
+
+class SessionRecorder:
+    # Cheap in-memory counters updated by GameManager while a session is played
+    def __init__(self, headless=False):
+        self.headless = headless
+        self.started_at = time.time()
+        self.levels = []
+        self.current = None
+        self.paddle_hits = 0
+
+    def start_level(self, level, ball_speed, tick, score):
+        self.current = {
+            "level": level,
+            "start_tick": tick,
+            "start_score": score,
+            "paddle_hits": 0,
+            "max_ball_speed": ball_speed,
+            "bricks": dict.fromkeys(BRICK_COLORS.values(), 0)
+        }
+
+    def brick_hit(self, color, count=1):
+        # Rewinding takes hits back out with a count of -1
+        if self.current is not None:
+            name = BRICK_COLORS.get(color)
+            if name is not None:
+                self.current["bricks"][name] += count
+
+    def paddle_hit(self, ball_speed, count=1):
+        self.paddle_hits += count
+        if self.current is not None:
+            self.current["paddle_hits"] += count
+            self.current["max_ball_speed"] = max(self.current["max_ball_speed"], ball_speed)
+
+    def end_level(self, cleared, tick, score):
+        if self.current is not None:
+            level = self.current
+            level["cleared"] = cleared
+            level["ticks"] = tick - level["start_tick"]
+            level["score"] = score - level["start_score"]
+            self.levels.append(level)
+            self.current = None
+
+    def finish(self, outcome, score, tick, cause_of_death=None, death_x=None):
+        levels = self.levels
+        return {
+            "started_at": self.started_at,
+            "ended_at": time.time(),
+            "final_score": score,
+            "level_reached": max((level["level"] for level in levels), default=1),
+            "outcome": outcome,
+            "cause_of_death": cause_of_death,
+            "death_x": death_x,
+            "paddle_hits": self.paddle_hits,
+            "max_ball_speed": max((level["max_ball_speed"] for level in levels), default=0.0),
+            "total_ticks": tick,
+            "headless": int(self.headless),
+            "levels": levels
+        }
+
+class SessionStore:
+    def __init__(self, path=None, batch_size=500, flush_interval=1.0):
+        self.path = path or default_database_path()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.writer_loop, name="session-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, session):
+        # Called from the game loop: only enqueues, never touches the database
+        self.queue.put(session)
+
+    def flush(self):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def writer_loop(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = connect(self.path)
+        except (OSError, sqlite3.Error) as error:
+            print(f"Could not open session database {self.path}: {error}", file=sys.stderr)
+            connection = None
+        self.ready.set()
+
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather whatever else arrives shortly after, up to one batch
+            while len(batch) < self.batch_size and batch[-1] is not None and not isinstance(batch[-1], threading.Event):
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            sessions = [item for item in batch if isinstance(item, dict)]
+            if sessions and connection is not None:
+                try:
+                    self.write_batch(connection, sessions)
+                except sqlite3.Error as error:
+                    print(f"Could not save {len(sessions)} sessions: {error}", file=sys.stderr)
+
+            for item in batch:
+                if item is None:
+                    closing = True
+                elif isinstance(item, threading.Event):
+                    item.set()
+
+        if connection is not None:
+            connection.close()
+
+    def write_batch(self, connection, sessions):
+        # SQLite assigns the session ids, so several stores can share one database; the level
+        # rows take each id from lastrowid inside the same transaction
+        session_insert = f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' * len(SESSION_COLUMNS))})"
+        level_rows = []
+        with connection:
+            cursor = connection.cursor()
+            for session in sessions:
+                cursor.execute(session_insert, tuple(session[column] for column in SESSION_COLUMNS))
+                session_id = cursor.lastrowid
+                for level in session["levels"]:
+                    bricks = level["bricks"]
+                    level_rows.append((session_id, level["level"], int(level["cleared"]), level["ticks"], level["score"],
+                                       level["paddle_hits"], level["max_ball_speed"], bricks["red"], bricks["green"],
+                                       bricks["blue"], bricks["orange"], bricks["yellow"]))
+            cursor.executemany(
+                f"INSERT INTO session_levels ({', '.join(LEVEL_COLUMNS)}) VALUES ({', '.join('?' * len(LEVEL_COLUMNS))})",
+                level_rows)
+
+def top_sessions(path=None, limit=10, headless=None):
+    connection = connect(path or default_database_path())
+    try:
+        query = "SELECT id, final_score, level_reached, outcome, total_ticks FROM sessions"
+        params = []
+        if headless is not None:
+            query += " WHERE headless = ?"
+            params.append(int(headless))
+        query += " ORDER BY final_score DESC LIMIT ?"
+        params.append(limit)
+        return connection.execute(query, params).fetchall()
+    finally:
+        connection.close()
+
+def level_aggregates(path=None):
+    # One row per level: attempts, clears, mean clear time in ticks and mean bricks hit by colour
+    connection = connect(path or default_database_path())
+    try:
+        return connection.execute("""
+            SELECT level,
+                   COUNT(*) AS attempts,
+                   SUM(cleared) AS clears,
+                   AVG(CASE WHEN cleared THEN ticks END) AS mean_clear_ticks,
+                   AVG(paddle_hits) AS mean_paddle_hits,
+                   MAX(max_ball_speed) AS max_ball_speed,
+                   AVG(bricks_red), AVG(bricks_green), AVG(bricks_blue), AVG(bricks_orange), AVG(bricks_yellow)
+            FROM session_levels
+            GROUP BY level
+            ORDER BY level
+        """).fetchall()
+    finally:
+        connection.close()
+
+# Main execution
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    print("Top sessions (id, score, level, outcome, ticks):")
+    for row in top_sessions(path):
+        print("  ", row)
+    print("Per level (level, attempts, clears, clear ticks, paddle hits, max speed, R G B O Y):")
+    for row in level_aggregates(path):
+        print("  ", row)
@@ -0,0 +1,78 @@
+import argparse
+import sys
+import time
+
+from autopilot import PredictiveAutopilot
+from breakout007 import GameManager, GameState
+from fast_forward import FastForward
+from session_store import SessionStore
+
+# Nightly soak test: the predictive autopilot plays headless games as fast as the simulation
+# allows and must clear all 10 levels. With fast=True the autopilot is only asked on ticks where
+# something can happen and the flights in between are jumped over; see fast_forward.py.
+
+NUM_LEVELS = 10
+
+def play_autopilot_game(autopilot=None, max_ticks=500000, game=None, fast=False):
+    # Returns (cleared levels, score, ticks per cleared level, game)
+    game = game or GameManager(headless=True)
+    autopilot = autopilot or PredictiveAutopilot()
+    fast_forward = FastForward(game) if fast else None
+    game.handle_click()  # Leave the start screen
+    level_ticks = []
+    level_start = game.ticks
+    cleared = 0
+    frames = 0
+    while frames < max_ticks:
+        frames += 1
+        state = game.current_state
+        if state == GameState.LEVEL_LOAD:
+            game.handle_click()
+            continue
+        if state in [GameState.GAME_OVER, GameState.GAME_WON]:
+            break
+        if fast_forward is not None:
+            frames += fast_forward.jump(max_ticks - frames)
+            if frames >= max_ticks:
+                break
+            fast_forward.step(autopilot.paddle_x(game))
+        else:
+            game.step(autopilot.paddle_x(game))
+        if game.current_state in [GameState.LEVEL_COMPLETE, GameState.LEVEL_LOAD, GameState.GAME_WON]:
+            level_ticks.append(game.ticks - level_start)
+            level_start = game.ticks
+            cleared += 1
+    return cleared, game.score, level_ticks, game
+
+def soak(games=1, max_ticks=500000, jitter=3.0, fast=False, sessions=None):
+    # sessions is a database path; every game is then recorded there like a played one
+    store = SessionStore(sessions) if sessions else None
+    failures = 0
+    for number in range(games):
+        # Game 1 plays the exact aim; later games add seeded aim errors to cover other trajectories
+        autopilot = PredictiveAutopilot(seed=number, jitter=jitter if number else 0.0)
+        start = time.perf_counter()
+        game = GameManager(headless=True, session_store=store)
+        cleared, score, level_ticks, game = play_autopilot_game(autopilot, max_ticks, game, fast)
+        elapsed = time.perf_counter() - start
+        won = game.current_state == GameState.GAME_WON
+        status = "PASS" if won else "FAIL"
+        print(f"{status} game {number + 1}: cleared {cleared}/{NUM_LEVELS} levels, score {score}, "
+              f"{game.ticks} ticks in {elapsed:.1f}s ({game.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+        print("    ticks per level: " + ", ".join(str(ticks) for ticks in level_ticks))
+        if not won:
+            failures += 1
+    if store is not None:
+        store.close()
+    return failures
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the predictive autopilot through every level.")
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--max-ticks", type=int, default=500000, help="Give up on a game after this many frames")
+    parser.add_argument("--jitter", type=float, default=3.0, help="Aim error in degrees for games after the first")
+    parser.add_argument("--fast", action="store_true", help="Jump over ticks where the ball only moves")
+    parser.add_argument("--sessions", help="Record the games in this session database")
+    args = parser.parse_args()
+    sys.exit(1 if soak(args.games, args.max_ticks, args.jitter, args.fast, args.sessions) else 0)
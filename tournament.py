@@ -0,0 +1,204 @@
+import argparse
+import csv
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import random
+import time
+
+from persistence import drop_partial_line
+
+# Tournament runner: every agent plays K seeded single-level episodes on each level, headless
+# in a process pool. Episode rows are appended to a CSV as they finish, so a resumed run skips
+# them, and the aggregates are written to a ranked leaderboard.
+#
+# An agent is given as "module", "module:factory" or "path/to/agent.py[:factory]". The factory
+# (make_agent by default) is called as factory(seed=seed) and must return an object with a
+# paddle_x(game) method; "autopilot" plays the predictive autopilot through autopilot.make_agent.
+
+NUM_LEVELS = 10
+EPISODE_FIELDS = ["agent", "level", "seed", "cleared", "score", "ticks"]
+
+def load_agent_factory(spec):
+    target, _, name = spec.partition(":")
+    if target.endswith(".py"):
+        module_name = os.path.splitext(os.path.basename(target))[0]
+        module_spec = importlib.util.spec_from_file_location(module_name, target)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    return getattr(module, name or "make_agent")
+
+def check_agents(agents):
+    # Resolve every spec up front, so a typo fails here rather than inside a pool worker
+    for spec in agents:
+        try:
+            factory = load_agent_factory(spec)
+        except (ImportError, AttributeError, OSError, SyntaxError) as error:
+            raise ValueError(f"Cannot load agent {spec!r}: {error}") from error
+        if not callable(factory):
+            raise ValueError(f"Agent factory {spec!r} is not callable")
+
+# Worker side: one game per process, with the state at the start of every level cached
+worker_game = None
+worker_level_starts = {}
+worker_factories = {}
+
+def level_start(level):
+    # Walk the real state machine once, so each level starts with the speed players get
+    global worker_game
+    from breakout007 import GameManager, GameState
+
+    if worker_game is None:
+        game = GameManager(headless=True)
+        game.handle_click()  # Start screen to level 1
+        for number in range(1, NUM_LEVELS + 1):
+            worker_level_starts[number] = game.clone()
+            if number < NUM_LEVELS:
+                game.handle_click()
+                game.change_state(GameState.LEVEL_COMPLETE)
+        worker_game = game
+    return worker_game, worker_level_starts[level]
+
+def play_episode(factory, level, seed, max_ticks):
+    from breakout007 import GameState
+
+    game, start = level_start(level)
+    game.restore(start)
+    # The seed picks the serve position and seeds the agent
+    rng = random.Random(seed)
+    game.step(rng.randint(game.paddle.width // 2, game.screen_width - game.paddle.width // 2))
+    game.handle_click()
+    agent = factory(seed=seed)
+    start_score = game.score
+    start_ticks = game.ticks
+    while game.current_state == GameState.GAME_RUNNING and game.ticks - start_ticks < max_ticks:
+        game.step(agent.paddle_x(game))
+    cleared = game.current_state in [GameState.LEVEL_LOAD, GameState.GAME_WON]
+    return cleared, game.score - start_score, game.ticks - start_ticks
+
+def play_batch(task):
+    spec, level, seeds, max_ticks = task
+    factory = worker_factories.get(spec)
+    if factory is None:
+        factory = worker_factories[spec] = load_agent_factory(spec)
+    rows = []
+    for seed in seeds:
+        cleared, score, ticks = play_episode(factory, level, seed, max_ticks)
+        rows.append({"agent": spec, "level": level, "seed": seed, "cleared": int(cleared),
+                     "score": score, "ticks": ticks})
+    return rows
+
+def finished_episodes(path):
+    if not os.path.exists(path):
+        return set()
+    drop_partial_line(path)
+    with open(path, newline="") as file:
+        return {(row["agent"], int(row["level"]), int(row["seed"])) for row in csv.DictReader(file)}
+
+def run_tournament(agents, output, episodes=100, levels=None, max_ticks=36000, processes=None, batch=10):
+    check_agents(agents)
+    levels = levels or list(range(1, NUM_LEVELS + 1))
+    done = finished_episodes(output)
+    tasks = []
+    for spec in agents:
+        for level in levels:
+            seeds = [seed for seed in range(episodes) if (spec, level, seed) not in done]
+            # Batches keep a worker on one agent and level, so its factory and level start are reused
+            for index in range(0, len(seeds), batch):
+                tasks.append((spec, level, seeds[index:index + batch], max_ticks))
+    remaining = sum(len(task[2]) for task in tasks)
+    print(f"{len(done)} episodes already played, {remaining} to play")
+    if not tasks:
+        return
+
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, "a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=EPISODE_FIELDS)
+        if new_file:
+            writer.writeheader()
+        start = time.perf_counter()
+        played = 0
+        with multiprocessing.Pool(processes) as pool:
+            for rows in pool.imap_unordered(play_batch, tasks):
+                writer.writerows(rows)
+                file.flush()
+                played += len(rows)
+                elapsed = time.perf_counter() - start
+                print(f"\r{played}/{remaining} episodes, {played / elapsed:.1f}/s", end="", flush=True)
+        print()
+
+def leaderboard(results_path):
+    # One row per agent, ranked by clear rate, then mean score, then mean ticks to clear
+    totals = {}
+    with open(results_path, newline="") as file:
+        for row in csv.DictReader(file):
+            entry = totals.setdefault(row["agent"], {"episodes": 0, "cleared": 0, "score": 0, "clear_ticks": 0,
+                                                     "levels": {}})
+            cleared = int(row["cleared"])
+            entry["episodes"] += 1
+            entry["cleared"] += cleared
+            entry["score"] += int(row["score"])
+            if cleared:
+                entry["clear_ticks"] += int(row["ticks"])
+            level = entry["levels"].setdefault(int(row["level"]), [0, 0])
+            level[0] += cleared
+            level[1] += 1
+
+    board = []
+    for agent, entry in totals.items():
+        row = {
+            "agent": agent,
+            "episodes": entry["episodes"],
+            "clear_rate": entry["cleared"] / entry["episodes"],
+            "mean_score": entry["score"] / entry["episodes"],
+            "mean_clear_ticks": entry["clear_ticks"] / entry["cleared"] if entry["cleared"] else None
+        }
+        for level in range(1, NUM_LEVELS + 1):
+            cleared, played = entry["levels"].get(level, (0, 0))
+            row[f"level_{level}_clear_rate"] = cleared / played if played else None
+        board.append(row)
+    board.sort(key=lambda row: (-row["clear_rate"], -row["mean_score"],
+                                row["mean_clear_ticks"] if row["mean_clear_ticks"] is not None else float("inf")))
+    for rank, row in enumerate(board, 1):
+        row["rank"] = rank
+    return board
+
+def write_leaderboard(board, path):
+    fields = ["rank", "agent", "episodes", "clear_rate", "mean_score", "mean_clear_ticks"] + [
+        f"level_{level}_clear_rate" for level in range(1, NUM_LEVELS + 1)]
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(board)
+
+def print_leaderboard(board):
+    print(f"{'Rank':>4}  {'Agent':<40} {'Episodes':>8} {'Clear':>6} {'Score':>7} {'Clear ticks':>11}")
+    for row in board:
+        clear_ticks = f"{row['mean_clear_ticks']:.0f}" if row["mean_clear_ticks"] is not None else "-"
+        print(f"{row['rank']:>4}  {row['agent']:<40} {row['episodes']:>8} {row['clear_rate']:>6.0%} "
+              f"{row['mean_score']:>7.1f} {clear_ticks:>11}")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank paddle agents over seeded single-level episodes.")
+    parser.add_argument("agents", nargs="+", help="module, module:factory or path/to/agent.py[:factory]")
+    parser.add_argument("--episodes", type=int, default=100, help="Seeded episodes per agent and level")
+    parser.add_argument("--level", type=int, action="append", help="Level to play (repeatable, default all)")
+    parser.add_argument("--max-ticks", type=int, default=36000, help="Episode tick limit (10 minutes of play)")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=10, help="Episodes handed to a worker at a time")
+    parser.add_argument("--results", default="tournament_episodes.csv")
+    parser.add_argument("--leaderboard", default="leaderboard.csv")
+    args = parser.parse_args()
+
+    try:
+        run_tournament(args.agents, args.results, args.episodes, args.level, args.max_ticks, args.processes,
+                       args.batch)
+    except ValueError as error:
+        parser.error(str(error))
+    board = leaderboard(args.results)
+    write_leaderboard(board, args.leaderboard)
+    print_leaderboard(board)
@@ -0,0 +1,347 @@
+import math
+from collections import namedtuple
+from itertools import accumulate, repeat
+
+# Analytic ball trajectory prediction. The ball moves in a straight line at its velocity per
+# tick and collisions are tested where the tick simulation tests them, at whole ticks: a wall
+# is hit on the first tick the centre is within the radius of it, and a brick on the first tick
+# the ball's truncated square overlaps the brick rect, as in check_collisions. A ball grazing a
+# brick corner between two ticks therefore misses it, as it does in the game. Wall and brick
+# times are whole ticks from now; the paddle line time is fractional, since what happens there
+# depends on the paddle, and the game reaches it on the first tick at or after that time.
+
+CollisionEvent = namedtuple("CollisionEvent", "time kind x y side brick")
+# kind is "wall", "brick" or "paddle"; side is the face that was hit ("left", "right", "top",
+# "bottom") and brick the index into game.bricks, or None for walls and the paddle line
+
+class BrickIndex:
+    # Uniform grid over the brick layout. Each cell lists the bricks overlapping it and its eight
+    # neighbours; as long as the radius is no larger than a cell, that is every brick the ball
+    # centre can touch while it is inside the cell.
+    def __init__(self, bricks, radius):
+        self.bricks = bricks
+        self.rects = [(b.rect.left, b.rect.top, b.rect.right, b.rect.bottom) for b in bricks]
+        if not bricks:
+            self.neighbours = {}
+            self.bounds = None
+            return
+        self.cell_width = max(min(b.width for b in bricks), radius)
+        self.cell_height = max(min(b.height for b in bricks), radius)
+        self.left = min(rect[0] for rect in self.rects)
+        self.top = min(rect[1] for rect in self.rects)
+        self.bounds = (self.left - radius, self.top - radius,
+                       max(rect[2] for rect in self.rects) + radius, max(rect[3] for rect in self.rects) + radius)
+
+        cells = {}
+        for index, (left, top, right, bottom) in enumerate(self.rects):
+            for col in range(self.column(left), self.column(right - 1e-9) + 1):
+                for row in range(self.row(top), self.row(bottom - 1e-9) + 1):
+                    cells.setdefault((col, row), []).append(index)
+        self.neighbours = {}
+        for col, row in cells:
+            for dc in (-1, 0, 1):
+                for dr in (-1, 0, 1):
+                    self.neighbours.setdefault((col + dc, row + dr), set()).update(cells[(col, row)])
+        self.neighbours = {cell: sorted(indices) for cell, indices in self.neighbours.items()}
+
+    def column(self, x):
+        return math.floor((x - self.left) / self.cell_width)
+
+    def row(self, y):
+        return math.floor((y - self.top) / self.cell_height)
+
+    def first_hit(self, xs, ys, vx, vy, radius, first, t_end, skip):
+        # Earliest brick hit on a tick from first to t_end of the path xs, ys: (tick, index) or
+        # None, the lowest index on a tie like collidelist. Walks the grid cells along the ray (a 2D DDA) and stops
+        # as soon as the next cell is entered later than the best hit found so far.
+        if self.bounds is None:
+            return None
+        x, y = xs[0], ys[0]
+        t_start, t_stop = clip_ray(x, y, vx, vy, self.bounds, t_end)
+        if t_start is None:
+            return None
+
+        col = self.column(x + vx * t_start)
+        row = self.row(y + vy * t_start)
+        if vx > 0:
+            step_col, t_col = 1, (self.left + (col + 1) * self.cell_width - x) / vx
+            delta_col = self.cell_width / vx
+        elif vx < 0:
+            step_col, t_col = -1, (self.left + col * self.cell_width - x) / vx
+            delta_col = -self.cell_width / vx
+        else:
+            step_col, t_col, delta_col = 0, math.inf, math.inf
+        if vy > 0:
+            step_row, t_row = 1, (self.top + (row + 1) * self.cell_height - y) / vy
+            delta_row = self.cell_height / vy
+        elif vy < 0:
+            step_row, t_row = -1, (self.top + row * self.cell_height - y) / vy
+            delta_row = -self.cell_height / vy
+        else:
+            step_row, t_row, delta_row = 0, math.inf, math.inf
+
+        bricks = self.bricks
+        rects = self.rects
+        tested = set()
+        best = None
+        best_time = t_end
+        cell_time = t_start
+        while cell_time <= min(best_time, t_stop):
+            for index in self.neighbours.get((col, row), ()):
+                if index in tested or index in skip or not bricks[index].active:
+                    continue
+                tested.add(index)
+                tick = first_overlap_tick(xs, ys, vx, vy, rects[index], radius, first, best_time)
+                if tick is not None and (best is None or tick < best[0] or (tick == best[0] and index < best[1])):
+                    best_time = tick
+                    best = (tick, index)
+            if t_col < t_row:
+                cell_time = t_col
+                col += step_col
+                t_col += delta_col
+            else:
+                cell_time = t_row
+                row += step_row
+                t_row += delta_row
+        return best
+
+def clip_ray(x, y, vx, vy, bounds, t_end):
+    # Time interval the ray spends inside bounds, limited to [0, t_end]
+    t_start, t_stop = 0.0, t_end + 1  # Whole ticks up to t_end lie inside the bounds
+    for position, velocity, low, high in ((x, vx, bounds[0], bounds[2]), (y, vy, bounds[1], bounds[3])):
+        if velocity == 0:
+            if not low <= position <= high:
+                return None, None
+            continue
+        t_low = (low - position) / velocity
+        t_high = (high - position) / velocity
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+        t_start = max(t_start, t_low)
+        t_stop = min(t_stop, t_high)
+    if t_start > t_stop:
+        return None, None
+    return t_start, t_stop
+
+def first_overlap_tick(xs, ys, vx, vy, rect, radius, first, last):
+    # First whole tick from first to last on which the ball's square, truncated like
+    # update_ball_rect, overlaps rect: floor(x) within [left - radius + 1, right + radius - 1]
+    # and the same for y
+    lows = (rect[0] - radius + 1, rect[1] - radius + 1)
+    highs = (rect[2] + radius, rect[3] + radius)  # Exclusive for the unfloored centre
+    t_in, t_out = first, last
+    for position, velocity, low, high in ((xs[0], vx, lows[0], highs[0]), (ys[0], vy, lows[1], highs[1])):
+        if velocity == 0:
+            if not low <= position < high:
+                return None
+            continue
+        t_low = (low - position) / velocity
+        t_high = (high - position) / velocity
+        t_in = max(t_in, min(t_low, t_high))
+        t_out = min(t_out, max(t_low, t_high))
+    # The interval is continuous; check the whole ticks in and around it exactly
+    for tick in range(max(first, math.ceil(t_in) - 1), int(min(t_out + 1, last, len(xs) - 1)) + 1):
+        if lows[0] <= xs[tick] < highs[0] and lows[1] <= ys[tick] < highs[1]:
+            return tick
+    return None
+
+def time_to(position, velocity, low, high):
+    # Time until position passes low or high in the direction of travel, unbounded otherwise
+    if velocity < 0:
+        return (low - position) / velocity
+    if velocity > 0 and high is not None:
+        return (high - position) / velocity
+    return math.inf
+
+def brick_side(x, y, vx, vy, rect):
+    # GameManager.calculate_collision_side_with_direction
+    left, top, right, bottom = rect
+    if vy > 0:
+        if y < top:
+            return "top"
+    elif vy < 0:
+        if y > bottom:
+            return "bottom"
+    if vx > 0:
+        if x < left:
+            return "left"
+    elif vx < 0:
+        if x > right:
+            return "right"
+    return "top" if y < top + (bottom - top) // 2 else "bottom"
+
+def wall_tick(path, velocity, low, high):
+    # First tick from 1 on which check_collisions clamps the position to low or high, or inf
+    reach = time_to(path[0], velocity, low, high)
+    if reach == math.inf:
+        return math.inf
+    for tick in range(max(1, math.ceil(reach) - 1), len(path)):
+        if (velocity < 0 and path[tick] <= low) or (velocity > 0 and high is not None and path[tick] >= high):
+            return tick
+    return math.inf
+
+def rescale(vx, vy, speed):
+    if speed is None:
+        return vx, vy
+    norm = math.sqrt(vx * vx + vy * vy)  # As Vector2.normalize computes it
+    return vx / norm * speed, vy / norm * speed
+
+def predict_collisions(x, y, vx, vy, radius, screen_width, paddle_line, brick_index=None, count=8, speed=None):
+    # The next `count` collision events, stopping at the paddle line (y of the ball centre when
+    # it reaches the paddle top) because what happens there depends on the paddle. Bricks hit
+    # on the way are treated as broken for the rest of the prediction. Every wall and brick
+    # event leaves the ball where the game has it on that tick, so later events stay on ticks.
+    # With speed, the velocity is rescaled to it after every bounce like normalize_ball_velocity;
+    # a served ball moves faster than its speed until its first bounce.
+    events = []
+    if vx == 0 and vy == 0:
+        return events
+    broken = set()
+    time = 0
+    first = 1  # A wall tick still tests the bricks at the clamped position, so the next segment starts at 0
+    while len(events) < count:
+        if vy > 0 and y >= paddle_line:
+            break  # Already past the paddle
+
+        # Positions on the coming ticks, added up like Ball.move so that ticks where the ball
+        # lands exactly on an edge round the same way as in the game
+        reach = min(time_to(x, vx, radius, screen_width - radius), time_to(y, vy, radius, paddle_line))
+        if reach == math.inf:
+            break
+        ticks = int(reach) + 3
+        xs = list(accumulate(repeat(vx, ticks), initial=x))
+        ys = list(accumulate(repeat(vy, ticks), initial=y))
+
+        x_tick = wall_tick(xs, vx, radius, screen_width - radius)
+        y_tick = wall_tick(ys, vy, radius, None)
+        wall = min(x_tick, y_tick)
+        t_paddle = (paddle_line - y) / vy if vy > 0 else math.inf
+        hit = None
+        if brick_index is not None:
+            hit = brick_index.first_hit(xs, ys, vx, vy, radius, first, min(wall - 1, t_paddle), broken)
+
+        if hit is not None:
+            tick, brick = hit
+            x = xs[tick]
+            y = ys[tick]
+            time += tick
+            side = brick_side(x, y, vx, vy, brick_index.rects[brick])
+            events.append(CollisionEvent(time, "brick", x, y, side, brick))
+            broken.add(brick)
+            # Reflect like handle_brick_collision, which leaves the velocity alone when the side
+            # does not oppose it
+            if (side == "top" and vy > 0) or (side == "bottom" and vy < 0):
+                vy = -vy
+            elif (side == "left" and vx > 0) or (side == "right" and vx < 0):
+                vx = -vx
+            vx, vy = rescale(vx, vy, speed)
+            first = 1
+        elif t_paddle < wall:
+            events.append(CollisionEvent(time + t_paddle, "paddle", x + vx * t_paddle, paddle_line, "top", None))
+            break
+        elif wall == math.inf:
+            break
+        else:
+            x = xs[wall]
+            y = ys[wall]
+            time += wall
+            # Each wall normalizes the velocity, twice in a corner, as check_collisions does
+            if x_tick == wall:
+                side = "left" if vx < 0 else "right"
+                x = radius if vx < 0 else screen_width - radius
+                vx, vy = rescale(-vx, vy, speed)
+                events.append(CollisionEvent(time, "wall", x, y, side, None))
+            if y_tick == wall:
+                y = radius
+                vx, vy = rescale(vx, -vy, speed)
+                events.append(CollisionEvent(time, "wall", x, y, "top", None))
+            first = 0
+    return events[:count]
+
+class TrajectoryPredictor:
+    # Memoizes predict_collisions per ball state and brick-mask version, so autopilots,
+    # overlays and the simulator can all ask within one tick and pay once
+    def __init__(self, screen_width, paddle_top, cache_size=64):
+        self.screen_width = screen_width
+        self.paddle_top = paddle_top
+        self.cache_size = cache_size
+        self.bricks = None
+        self.radius = None
+        self.brick_index = None
+        self.version = None
+        self.cache = {}
+
+    def predict(self, x, y, vx, vy, radius, bricks, version, count=8, speed=None):
+        if bricks is not self.bricks or radius != self.radius:
+            self.bricks = bricks
+            self.radius = radius
+            self.brick_index = BrickIndex(bricks, radius)
+            self.cache.clear()
+        if version != self.version:
+            self.version = version
+            self.cache.clear()
+
+        key = (x, y, vx, vy, count, speed)
+        events = self.cache.get(key)
+        if events is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            events = tuple(predict_collisions(x, y, vx, vy, radius, self.screen_width,
+                                              self.paddle_top - radius, self.brick_index, count, speed))
+            self.cache[key] = events
+        return events
+
+def check_predictions(every=7, count=8, max_ticks=300000):
+    # Plays an autopilot game and, every few ticks, steps a copy of it with the paddle held to
+    # the end of the prediction; returns (predicted events, events that differ). Compares the
+    # brick and wall events up to the paddle line both ways.
+    from autopilot import PredictiveAutopilot
+    from breakout007 import GameManager, GameState
+    from rewind import NO_BRICK
+
+    game = GameManager(headless=True)
+    autopilot = PredictiveAutopilot(seed=0)
+    radius = game.ball.radius
+    walls = (radius, game.screen_width - radius)
+    game.handle_click()
+    checked = mismatches = 0
+    while game.ticks < max_ticks and game.current_state in [GameState.LEVEL_LOAD, GameState.GAME_RUNNING]:
+        if game.current_state == GameState.LEVEL_LOAD:
+            game.handle_click()
+            continue
+        events = game.predict_collisions(count) if game.ticks % every == 0 else ()
+        if events:
+            # Up to the tick before the paddle line, or before the last event when the count ran
+            # out, since more can happen on that tick than the prediction lists
+            end = math.ceil(events[-1].time) - 1
+            predicted = {(event.time, event.kind, event.brick) for event in events
+                         if event.kind != "paddle" and event.time <= end}
+            root = game.clone()
+            actual = set()
+            for tick in range(1, end + 1):
+                game.step(-1)  # Off screen: the paddle stays where it is
+                ball = game.ball
+                if ball.position.x in walls:
+                    actual.add((tick, "wall", None))
+                if ball.position.y == radius:
+                    actual.add((tick, "wall", None))
+                if game.tick_brick_hit != NO_BRICK:
+                    actual.add((tick, "brick", game.tick_brick_hit))
+                if game.current_state != GameState.GAME_RUNNING:
+                    # The last brick ends the level; the prediction knows nothing of that
+                    predicted = {event for event in predicted if event[0] <= tick}
+                    break
+            game.restore(root)
+            checked += len(predicted)
+            mismatches += len(predicted ^ actual)
+        game.step(autopilot.paddle_x(game))
+    return checked, mismatches
+
+# Main execution
+if __name__ == "__main__":
+    import sys
+
+    checked, failures = check_predictions()
+    print(f"{'PASS' if not failures else 'FAIL'}: {failures} of {checked} predicted wall and brick events differ "
+          "from stepping the game")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,219 @@
+import argparse
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from breakout007 import GameManager, GameState
+from observation import PLANES, ObservationRenderer
+
+# Headless Breakout as a learning environment, and a vectorized version that steps slices of
+# envs in worker processes. Actions, observations, rewards and done flags live in one shared
+# memory block; the trainer and workers take turns on it, separated by two barrier waits per
+# step, so nothing is pickled after start-up.
+
+STEP = 1
+RESET = 2
+CLOSE = 3
+ALIGNMENT = 64  # Fields start on their own cache line
+
+class BreakoutEnv:
+    # One headless game. The action is the mouse x for the next tick(s), the reward the points
+    # scored and the episode ends when the ball is lost, the game is won or max_ticks is reached.
+    def __init__(self, frame_skip=1, max_ticks=None):
+        self.frame_skip = frame_skip
+        self.max_ticks = max_ticks
+        self.game = GameManager(headless=True)
+
+    def reset(self):
+        game = self.game
+        game.level = 1
+        game.score = 0
+        game.ticks = 0
+        game.paddle.move(game.screen_width // 2, game.screen_width)
+        game.current_state = GameState.START_SCREEN
+        game.handle_click()  # Start screen to level load
+        game.handle_click()  # Serve
+        return game
+
+    def step(self, action):
+        game = self.game
+        score = game.score
+        done = False
+        for _ in range(self.frame_skip):
+            if game.current_state == GameState.LEVEL_LOAD:
+                game.handle_click()  # Serve the next level straight away
+            game.step(int(action))
+            if game.current_state in [GameState.GAME_OVER, GameState.GAME_WON]:
+                done = True
+                break
+            if self.max_ticks is not None and game.ticks >= self.max_ticks:
+                done = True
+                break
+        return game.score - score, done
+
+def observation_shape(observation, renderer):
+    if observation == "pixels":
+        return (renderer.height, renderer.width)
+    if observation == "grid":
+        return (PLANES, renderer.grid_rows, renderer.grid_columns)
+    raise ValueError(f"Unknown observation type: {observation}")
+
+def block_layout(num_envs, obs_shape):
+    # (name, dtype, shape, offset) for every field, and the total size of the block
+    fields = [("command", np.int32, (1,)), ("actions", np.float32, (num_envs,)),
+              ("rewards", np.float32, (num_envs,)), ("dones", np.uint8, (num_envs,)),
+              ("scores", np.float32, (num_envs,)), ("observations", np.uint8, (num_envs,) + obs_shape)]
+    layout = []
+    offset = 0
+    for name, dtype, shape in fields:
+        layout.append((name, dtype, shape, offset))
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -(-size // ALIGNMENT) * ALIGNMENT
+    return layout, offset
+
+def block_views(buffer, layout):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+def worker(name, layout, start, end, barrier, observation, frame_skip, max_ticks):
+    # Workers share the trainer's resource tracker, so attaching does not add a second owner
+    block = shared_memory.SharedMemory(name)
+    views = block_views(block.buf, layout)
+    command = views["command"]
+    actions = views["actions"][start:end]
+    rewards = views["rewards"][start:end]
+    dones = views["dones"][start:end]
+    scores = views["scores"][start:end]
+    observations = views["observations"][start:end]
+    envs = [BreakoutEnv(frame_skip, max_ticks) for _ in range(end - start)]
+    games = [env.game for env in envs]
+    renderer = ObservationRenderer()
+    render = renderer.render if observation == "pixels" else renderer.grid_planes
+    try:
+        while True:
+            barrier.wait()  # Trainer has written the command and actions; it may take as long as it likes
+            if command[0] == CLOSE:
+                break
+            if command[0] == RESET:
+                for env in envs:
+                    env.reset()
+                rewards[:] = 0
+                dones[:] = 0
+                scores[:] = 0
+            else:
+                for index, env in enumerate(envs):
+                    reward, done = env.step(actions[index])
+                    rewards[index] = reward
+                    dones[index] = done
+                    scores[index] = env.game.score
+                    if done:
+                        env.reset()  # The observation is the first frame of the next episode
+            render(games, out=observations)
+            barrier.wait()  # Results are in the block
+    except threading.BrokenBarrierError:
+        pass  # The trainer or another worker went away
+    finally:
+        del command, actions, rewards, dones, scores, observations, views
+        block.close()
+
+class SharedMemoryVectorEnv:
+    # step() and reset() return NumPy views into the shared block, not copies; they stay valid
+    # until the next call. scores holds each env's score, or the final score where done is set.
+    def __init__(self, num_envs, num_workers=None, observation="pixels", frame_skip=1, max_ticks=None,
+                 timeout=60):
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        shape = observation_shape(observation, ObservationRenderer())
+        layout, size = block_layout(num_envs, shape)
+        self.block = shared_memory.SharedMemory(create=True, size=size)
+        views = block_views(self.block.buf, layout)
+        self.command = views["command"]
+        self.actions = views["actions"]
+        self.rewards = views["rewards"]
+        self.dones = views["dones"]
+        self.scores = views["scores"]
+        self.observations = views["observations"]
+
+        # No default timeout: workers idle between commands for as long as the trainer needs, and
+        # only the trainer's waits are bounded
+        self.barrier = multiprocessing.Barrier(num_workers + 1)
+        self.timeout = timeout
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.workers = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            process = multiprocessing.Process(target=worker, daemon=True,
+                                              args=(self.block.name, layout, int(start), int(end), self.barrier,
+                                                    observation, frame_skip, max_ticks))
+            process.start()
+            self.workers.append(process)
+        self.closed = False
+
+    def run(self, command):
+        self.command[0] = command
+        try:
+            self.barrier.wait(self.timeout)
+            if command != CLOSE:
+                self.barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            self.close()
+            raise RuntimeError("A vector env worker stopped responding")
+
+    def reset(self):
+        self.run(RESET)
+        return self.observations
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self.run(STEP)
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if not self.barrier.broken:
+            self.command[0] = CLOSE
+            try:
+                self.barrier.wait(self.timeout)
+            except threading.BrokenBarrierError:
+                pass
+        for process in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        del self.command, self.actions, self.rewards, self.dones, self.scores, self.observations
+        self.block.close()
+        self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def benchmark(num_envs, num_workers, observation, steps):
+    # Random paddle positions; reports env steps per second including observation writes
+    rng = np.random.default_rng(0)
+    with SharedMemoryVectorEnv(num_envs, num_workers, observation) as env:
+        env.reset()
+        start = time.perf_counter()
+        episodes = 0
+        for _ in range(steps):
+            _, _, dones = env.step(rng.uniform(0, 800, num_envs))
+            episodes += int(dones.sum())
+        elapsed = time.perf_counter() - start
+    print(f"{num_envs} envs on {num_workers} workers, {observation} observations: "
+          f"{steps * num_envs / elapsed:.0f} env steps/s, {episodes} episodes finished")
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the shared memory vectorized Breakout env.")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--observation", choices=["pixels", "grid"], default="pixels")
+    parser.add_argument("--steps", type=int, default=1000)
+    args = parser.parse_args()
+    benchmark(args.envs, args.workers, args.observation, args.steps)